@@ -1,5 +1,7 @@
+from contextlib import nullcontext
 import json
 import operator
+import os
 import re
 from typing import Annotated, Literal, Sequence, TypedDict
 
@@ -8,60 +10,64 @@ from langchain_ollama import ChatOllama
 from langgraph.graph import END, START, StateGraph
 from langgraph.prebuilt import ToolNode
 
+from budget import Budget, run_config, sync_checkpointer, with_budget
+from code_executor import local_code_tool
+from few_shot import dynamic_examples, static_examples
+from llm_metrics import LLM_METRICS
+from tool_schema import SCHEMA_MODES, compact_tools
 from tools import get_part_id, get_shipping_cost, get_stock_level, get_supplier_location
+from tools import release_stock, reserve_stock, transfer_reservation
 
 MODEL_NAME = "granite4:tiny-h" 
-llm = ChatOllama(model=MODEL_NAME, temperature=0, num_ctx=10240)
+llm = ChatOllama(model=MODEL_NAME, temperature=0, num_ctx=10240, callbacks=[LLM_METRICS])
 
-def inventory_node(state):
-    """Worker 1"""
-    messages = state['messages']
-    sys_msg = SystemMessage(content="""You are the Inventory Manager. Your sole purpose is to handle requests related to **Part IDs** and **Stock Levels**.
+# verbose, compact or minimal tool descriptions for the workers (see tool_schema.py)
+TOOL_SCHEMA_MODE = os.environ.get("TOOL_SCHEMA_MODE", "verbose")
+if TOOL_SCHEMA_MODE not in SCHEMA_MODES:
+    raise ValueError(f"Unknown TOOL_SCHEMA_MODE: {TOOL_SCHEMA_MODE} (expected one of {SCHEMA_MODES})")
+
+# Supervisor routing: Ollama constrains decoding to this schema, so the reply is a bare JSON object
+STRUCTURED_ROUTING = True
+ROUTING_MAX_TOKENS = 24
+ROUTES = ["Inventory_Worker", "Logistics_Worker", "FINISH"]
+ROUTE_SCHEMA = {
+    "type": "object",
+    "properties": {"next": {"type": "string", "enum": ROUTES}},
+    "required": ["next"]
+}
+routing_llm = ChatOllama(model=MODEL_NAME, temperature=0, num_ctx=10240, format=ROUTE_SCHEMA, num_predict=ROUTING_MAX_TOKENS,
+                         callbacks=[LLM_METRICS])
+
+# How each supervisor decision was obtained
+ROUTING_STATS = {"structured": 0, "regex_json": 0, "keyword": 0, "default_finish": 0}
+
+def reset_routing_stats():
+    for key in ROUTING_STATS: ROUTING_STATS[key] = 0
+
+# static: fixed few-shot blocks; dynamic: k most similar examples per query under a token budget (see few_shot.py)
+FEW_SHOT_MODES = ["static", "dynamic"]
+FEW_SHOT_MODE = os.environ.get("FEW_SHOT_MODE", "static")
+if FEW_SHOT_MODE not in FEW_SHOT_MODES:
+    raise ValueError(f"Unknown FEW_SHOT_MODE: {FEW_SHOT_MODE} (expected one of {FEW_SHOT_MODES})")
+
+# WORKER_CODE_TOOL=1 also gives both workers execute_python_code, run locally by code_executor.py (lookups only)
+WORKER_CODE_TOOL = os.environ.get("WORKER_CODE_TOOL") == "1"
+code_tools = [local_code_tool()] if WORKER_CODE_TOOL else []
+
+INVENTORY_PROMPT = """You are the Inventory Manager. Your sole purpose is to handle requests related to **Part IDs**, **Stock Levels** and **Stock Reservations**.
     
-    You have access to two tools: `get_part_id` and `get_stock_level`.
+    You have access to the tools `get_part_id` and `get_stock_level`, plus `reserve_stock`, `release_stock` and `transfer_reservation` for orders.
     
     RULES:
     1. Always use `get_part_id` first if the user provides a common part name (e.g., Engine). You cannot check stock without the ID.
     2. After gathering all necessary information using the tools, state the final answer clearly to the Supervisor/User.
     3. Do NOT provide multi-step calculations or reasoning. Just use the tools and output the result.
+    4. Reserved units are not available: when `get_stock_level` reports reservations, only offer the available units.
 
-    FEW-SHOT EXAMPLE:
-    User: How many Windshields are in stock?
-    Worker: 
-    
-    Call: get_part_id("Windshield")
-    Result: ID-555
-    
-    Call: get_stock_level("ID-555")
-    Result: 15
-    
-    Final Answer: There are 15 Windshields in stock.
+    {examples}
+    """
 
-    FEW-SHOT EXAMPLE (MULTI-STEP):
-    User: How many Engines do we have?
-    Worker: 
-    
-    # Step 1: Find ID
-    Call: get_part_id("Engine")
-    Result: ID-999
-    
-    # Step 2: Check Stock
-    Call: get_stock_level("ID-999")
-    Result: 4
-    
-    Final Answer: We have 4 Engines in stock.
-    """)
-    
-    tools = [get_part_id, get_stock_level]
-    llm_with_tools = llm.bind_tools(tools) 
-    
-    response = llm_with_tools.invoke([sys_msg] + messages) 
-    return {"messages": [response]}
-
-def logistics_node(state):
-    """Worker 2"""
-    messages = state['messages']
-    sys_msg = SystemMessage(content="""You are the Logistics Manager. Your sole purpose is to handle requests related to **Supplier Locations** and **Shipping Costs**.
+LOGISTICS_PROMPT = """You are the Logistics Manager. Your sole purpose is to handle requests related to **Supplier Locations** and **Shipping Costs**.
     
     You have access to two tools: `get_supplier_location` and `get_shipping_cost`.
     
@@ -70,38 +76,38 @@ def logistics_node(state):
     2. After gathering all necessary information using the tools, state the final answer clearly to the Supervisor/User.
     3. Do NOT provide multi-step calculations or reasoning. Just use the tools and output the result.
 
-    FEW-SHOT EXAMPLE:
-    User: What is the cost to ship ID-200?
-    Worker: 
-    
-    Call: get_supplier_location("ID-200")
-    Result: Berlin
-    
-    Call: get_shipping_cost("Berlin")
-    Result: 60 EUR
-    
-    Final Answer: The shipping cost for ID-200 is 60 EUR.
+    {examples}
+    """
 
-    FEW-SHOT EXAMPLE (MULTI-STEP):
-    User: How much to ship for a Tire? (The Supervisor already found ID-100)
-    Worker: 
-    
-    Call: get_supplier_location("ID-100")
-    Result: Munich
+def worker_examples(worker, messages):
+    if FEW_SHOT_MODE == "dynamic":
+        return dynamic_examples(worker, str(messages[0].content))
+    return static_examples(worker)
+
+def inventory_node(state):
+    """Worker 1"""
+    messages = state['messages']
+    sys_msg = SystemMessage(content=INVENTORY_PROMPT.format(examples=worker_examples("inventory", messages)))
     
-    Call: get_shipping_cost("Munich")
-    Result: 50 EUR
+    tools = compact_tools([get_part_id, get_stock_level, reserve_stock, release_stock, transfer_reservation], TOOL_SCHEMA_MODE)
+    llm_with_tools = llm.bind_tools(tools + code_tools) 
     
-    Final Answer: The shipping cost for the Tire supplier is 50 EUR.
-    """)
+    response = llm_with_tools.invoke([sys_msg] + messages) 
+    return {"messages": [response]}
+
+def logistics_node(state):
+    """Worker 2"""
+    messages = state['messages']
+    sys_msg = SystemMessage(content=LOGISTICS_PROMPT.format(examples=worker_examples("logistics", messages)))
     
-    tools = [get_supplier_location, get_shipping_cost]
-    llm_with_tools = llm.bind_tools(tools)
+    tools = compact_tools([get_supplier_location, get_shipping_cost], TOOL_SCHEMA_MODE)
+    llm_with_tools = llm.bind_tools(tools + code_tools)
     
     response = llm_with_tools.invoke([sys_msg] + messages)
     return {"messages": [response]} 
 
-all_tools = [get_part_id, get_stock_level, get_supplier_location, get_shipping_cost]
+all_tools = [get_part_id, get_stock_level, get_supplier_location, get_shipping_cost,
+             reserve_stock, release_stock, transfer_reservation] + code_tools
 tool_node = ToolNode(all_tools)
 
 class SupervisorState(TypedDict):
@@ -114,7 +120,7 @@ def supervisor_node(state: SupervisorState):
     last_user_message = messages[0].content
     
     system_prompt = """You are the SCM Supervisor. You manage two workers:
-    1. Inventory_Worker: Handles Part IDs and Stock Checks.
+    1. Inventory_Worker: Handles Part IDs, Stock Checks and Stock Reservations.
     2. Logistics_Worker: Handles Supplier Cities and Shipping Costs.
 
     YOUR JOB:
@@ -131,28 +137,44 @@ def supervisor_node(state: SupervisorState):
     """
     
     supervisor_messages = [{"role": "system", "content": system_prompt}] + messages
-    response = llm.invoke(supervisor_messages)
-    
+    response = (routing_llm if STRUCTURED_ROUTING else llm).invoke(supervisor_messages)
+    content = str(response.content)
+
+    if STRUCTURED_ROUTING:
+        try:
+            decision = json.loads(content).get("next")
+            if decision in ROUTES:
+                ROUTING_STATS["structured"] += 1
+                return {"next": decision}
+        except (json.JSONDecodeError, AttributeError):
+            pass
+
     try:
-        content = response.content
         match = re.search(r"(\{.*\})", content, re.DOTALL)
         if match:
-            decision = json.loads(match.group(1))
-            return {"next": decision.get("next", "FINISH")}
-    except:
+            decision = json.loads(match.group(1)).get("next", "FINISH")
+            if decision in ROUTES:
+                ROUTING_STATS["regex_json"] += 1
+                return {"next": decision}
+    except (json.JSONDecodeError, AttributeError):
         pass
         
-    lower_content = response.content.lower()
-    if "inventory" in lower_content: return {"next": "Inventory_Worker"}
-    if "logistics" in lower_content: return {"next": "Logistics_Worker"}
+    lower_content = content.lower()
+    if "inventory" in lower_content:
+        ROUTING_STATS["keyword"] += 1
+        return {"next": "Inventory_Worker"}
+    if "logistics" in lower_content:
+        ROUTING_STATS["keyword"] += 1
+        return {"next": "Logistics_Worker"}
+    ROUTING_STATS["default_finish"] += 1
     return {"next": "FINISH"}
 
 # Graph
 workflow = StateGraph(SupervisorState)
 
-workflow.add_node("Supervisor", supervisor_node)
-workflow.add_node("Inventory_Worker", inventory_node)
-workflow.add_node("Logistics_Worker", logistics_node)
+workflow.add_node("Supervisor", with_budget(supervisor_node))
+workflow.add_node("Inventory_Worker", with_budget(inventory_node))
+workflow.add_node("Logistics_Worker", with_budget(logistics_node))
 workflow.add_node("tools", tool_node)
 
 workflow.set_entry_point("Supervisor")
@@ -180,7 +202,25 @@ workflow.add_edge("tools", "Supervisor")
 
 app = workflow.compile()
 
-def run_hierarchical_agent(query: str):
+# Same graph persisted to budget.CHECKPOINT_DB, compiled on first checkpointed run
+_checkpointed_app = None
+
+def checkpointed_app():
+    global _checkpointed_app
+    if _checkpointed_app is None:
+        _checkpointed_app = workflow.compile(checkpointer=sync_checkpointer())
+    return _checkpointed_app
+
+def run_hierarchical_agent(query: str, budget: Budget = None, thread_id: str = None):
+    """Raises budget.BudgetExceeded between nodes; with a thread_id every step is checkpointed"""
+    graph = checkpointed_app() if thread_id else app
     initial_state = {"messages": [HumanMessage(content=query)]}
-    result = app.invoke(initial_state, {"recursion_limit": 20})
+    with budget.active() if budget else nullcontext():
+        result = graph.invoke(initial_state, run_config(budget, thread_id, recursion_limit=20))
+    return result["messages"][-1].content, result["messages"]
+
+def resume_hierarchical_agent(thread_id: str, budget: Budget = None):
+    """Continues an interrupted or budget-exceeded run from its last checkpoint"""
+    with budget.active() if budget else nullcontext():
+        result = checkpointed_app().invoke(None, run_config(budget, thread_id, recursion_limit=20))
     return result["messages"][-1].content, result["messages"]
\ No newline at end of file
@@ -0,0 +1,280 @@
+import argparse
+import asyncio
+import json
+import time
+from contextlib import AsyncExitStack, asynccontextmanager
+
+from langchain_core.messages import AIMessage, HumanMessage, SystemMessage, ToolMessage
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.responses import JSONResponse, PlainTextResponse, StreamingResponse
+from starlette.routing import Route
+
+from agent_graph import app as hierarchical_app
+from budget import Budget, BudgetExceeded, run_config
+from evaluate_code import SYSTEM_PROMPT as CODE_PROMPT
+from evaluate_mcp import SYSTEM_PROMPT as MCP_PROMPT
+from mcp_client import mcp_server_context, open_session, read_server_metrics, use_session
+from metrics import Counter, Gauge, Histogram, render
+
+# Requests running at once per paradigm; Ollama runs up to OLLAMA_NUM_PARALLEL of them in one batch
+CONCURRENCY = {"hierarchical": 2, "mcp": 4, "code": 4}
+# Waiting + running requests beyond this are rejected with 429
+MAX_QUEUE = 64
+# A dispatcher holds the first queued request this long so requests arriving together start together
+BATCH_WINDOW = 0.05
+# Per-request budget, checked between graph nodes, so a runaway graph cannot hold a slot
+MAX_LLM_CALLS = 20
+MAX_TOKENS = 60000
+MAX_SECONDS = 300.0
+# Backstop for a single LLM call hanging past the budget
+REQUEST_TIMEOUT = MAX_SECONDS + 120.0
+
+SERVICE_WAITING = Gauge("scm_service_waiting", "Requests queued or taken by the dispatcher and not yet started", ("paradigm",))
+SERVICE_INFLIGHT = Gauge("scm_service_inflight", "Requests currently running", ("paradigm",))
+SERVICE_REQUESTS = Counter("scm_service_requests_total", "Requests by outcome (completed, budget, timeout, failed, cancelled, rejected)", ("paradigm", "outcome"))
+SERVICE_QUEUE_SECONDS = Histogram("scm_service_queue_seconds", "Time from admission to start", ("paradigm",))
+
+class ParadigmQueue:
+    """Admission-controlled queue that starts requests in micro-batches up to the paradigm's concurrency"""
+
+    def __init__(self, name: str, limit: int, runner):
+        self.name = name
+        self.limit = limit
+        self.runner = runner
+        self.queue = asyncio.Queue()
+        # Taken off the queue by the dispatcher but still waiting for a slot
+        self.dispatching = 0
+        self.running = 0
+        self.slots = asyncio.Semaphore(limit)
+        # Running serve tasks by their request's events queue (the loop only keeps weak references to tasks)
+        self.tasks = {}
+        # Events queues of requests not started yet; a disconnect before the start removes its entry
+        self.pending = set()
+        self.stats = {"accepted": 0, "rejected": 0, "completed": 0, "budget": 0, "timeout": 0, "failed": 0, "cancelled": 0,
+                      "batches": 0}
+        SERVICE_WAITING.track(self.waiting, paradigm=name)
+        SERVICE_INFLIGHT.track(lambda: self.running, paradigm=name)
+
+    def waiting(self) -> int:
+        return self.queue.qsize() + self.dispatching
+
+    def depth(self) -> int:
+        return self.waiting() + self.running
+
+    def submit(self, query: str, events: asyncio.Queue) -> bool:
+        if self.depth() >= MAX_QUEUE:
+            self.stats["rejected"] += 1
+            SERVICE_REQUESTS.inc(paradigm=self.name, outcome="rejected")
+            return False
+        self.stats["accepted"] += 1
+        self.pending.add(events)
+        self.queue.put_nowait((query, events, time.time()))
+        events.put_nowait({"event": "queued", "position": self.waiting()})
+        return True
+
+    async def dispatch(self):
+        while True:
+            batch = [await self.queue.get()]
+            self.dispatching += 1
+            await asyncio.sleep(BATCH_WINDOW)
+            while len(batch) < self.limit and not self.queue.empty():
+                batch.append(self.queue.get_nowait())
+                self.dispatching += 1
+            self.stats["batches"] += 1
+            for item in batch:
+                await self.slots.acquire()
+                self.dispatching -= 1
+                self.running += 1
+                events = item[1]
+                self.tasks[events] = asyncio.create_task(self.serve(*item))
+                self.tasks[events].add_done_callback(lambda _, events=events: self.finished(events))
+
+    def finished(self, events: asyncio.Queue):
+        """Frees the slot; a done callback because a task cancelled before its first step never runs serve's finally"""
+        del self.tasks[events]
+        self.pending.discard(events)
+        self.running -= 1
+        self.slots.release()
+
+    def cancel(self, events: asyncio.Queue):
+        """Stops a request whose client disconnected: cancels it if running, otherwise drops it when it starts"""
+        task = self.tasks.get(events)
+        if task is not None: task.cancel()
+        else: self.pending.discard(events)
+
+    def cancel_all(self):
+        for task in list(self.tasks.values()): task.cancel()
+
+    async def serve(self, query: str, events: asyncio.Queue, enqueued: float):
+        try:
+            if events not in self.pending: raise asyncio.CancelledError()
+            self.pending.discard(events)
+            SERVICE_QUEUE_SECONDS.observe(time.time() - enqueued, paradigm=self.name)
+            events.put_nowait({"event": "started", "queue_seconds": round(time.time() - enqueued, 3)})
+            # a timed-out hierarchical run keeps its worker thread until the budget stops it at the next node
+            budget = Budget(MAX_LLM_CALLS, MAX_TOKENS, MAX_SECONDS)
+            answer = await asyncio.wait_for(self.runner(query, events, budget), timeout=REQUEST_TIMEOUT)
+            events.put_nowait({"event": "answer", "content": answer, "seconds": round(time.time() - enqueued, 3)})
+            self.stats["completed"] += 1
+            SERVICE_REQUESTS.inc(paradigm=self.name, outcome="completed")
+        except BudgetExceeded as e:
+            events.put_nowait({"event": "error", "message": e.reason, "usage": e.usage})
+            self.stats["budget"] += 1
+            SERVICE_REQUESTS.inc(paradigm=self.name, outcome="budget")
+        except asyncio.TimeoutError:
+            events.put_nowait({"event": "error", "message": f"Timeout: request exceeded {REQUEST_TIMEOUT:.0f} seconds"})
+            self.stats["timeout"] += 1
+            SERVICE_REQUESTS.inc(paradigm=self.name, outcome="timeout")
+        except asyncio.CancelledError:
+            self.stats["cancelled"] += 1
+            SERVICE_REQUESTS.inc(paradigm=self.name, outcome="cancelled")
+            raise
+        except Exception as e:
+            events.put_nowait({"event": "error", "message": str(e)})
+            self.stats["failed"] += 1
+            SERVICE_REQUESTS.inc(paradigm=self.name, outcome="failed")
+        finally:
+            events.put_nowait(None)
+
+def message_events(messages: list) -> list:
+    """Progress events for new graph messages"""
+    events = []
+    for m in messages:
+        if isinstance(m, AIMessage) and m.tool_calls:
+            events += [{"event": "tool_call", "name": tc["name"], "args": tc["args"]} for tc in m.tool_calls]
+        elif isinstance(m, ToolMessage):
+            events.append({"event": "tool_result", "name": m.name, "content": str(m.content)})
+    return events
+
+def make_mcp_runner(agent, session, prompt: str):
+    async def run(query: str, events: asyncio.Queue, budget: Budget) -> str:
+        messages = [SystemMessage(content=prompt), HumanMessage(content=query)]
+        answer = ""
+        with use_session(session), budget.active():
+            async for update in agent.astream({"messages": messages}, run_config(budget), stream_mode="updates"):
+                for node_update in update.values():
+                    new_messages = (node_update or {}).get("messages", [])
+                    for event in message_events(new_messages): events.put_nowait(event)
+                    if new_messages and isinstance(new_messages[-1], AIMessage): answer = str(new_messages[-1].content)
+        return answer
+    return run
+
+async def run_hierarchical(query: str, events: asyncio.Queue, budget: Budget) -> str:
+    """Streams the synchronous supervisor graph from a worker thread"""
+    loop = asyncio.get_running_loop()
+
+    def stream():
+        answer = ""
+        updates = hierarchical_app.stream({"messages": [HumanMessage(content=query)]}, run_config(budget, recursion_limit=20), stream_mode="updates")
+        with budget.active():
+            for update in updates:
+                for node, node_update in update.items():
+                    node_update = node_update or {}
+                    if "next" in node_update:
+                        loop.call_soon_threadsafe(events.put_nowait, {"event": "route", "next": node_update["next"]})
+                    new_messages = node_update.get("messages", [])
+                    for event in message_events(new_messages): loop.call_soon_threadsafe(events.put_nowait, event)
+                    if new_messages and isinstance(new_messages[-1], AIMessage): answer = str(new_messages[-1].content)
+        return answer
+
+    return await asyncio.to_thread(stream)
+
+queues = {}
+# MCP session per server-backed paradigm (all the same one), for reading that server's metrics
+sessions = {}
+
+@asynccontextmanager
+async def lifespan(app):
+    """Keeps one warm MCP connection and a compiled graph per paradigm for the service lifetime.
+    The mcp and code agents share that connection's server, so they see one stock store and one set of reservations."""
+    async with AsyncExitStack() as stack:
+        session = await stack.enter_async_context(open_session())
+        runners = {"hierarchical": run_hierarchical}
+        for paradigm, mode, prompt in [("mcp", "standard", MCP_PROMPT), ("code", "code", CODE_PROMPT)]:
+            agent = await stack.enter_async_context(mcp_server_context(mode=mode, session=session))
+            sessions[paradigm] = session
+            runners[paradigm] = make_mcp_runner(agent, session, prompt)
+
+        dispatchers = []
+        for paradigm, runner in runners.items():
+            queues[paradigm] = ParadigmQueue(paradigm, CONCURRENCY[paradigm], runner)
+            dispatchers.append(asyncio.create_task(queues[paradigm].dispatch()))
+        print(f"Agent service ready: {', '.join(queues)}")
+        try:
+            yield
+        finally:
+            for task in dispatchers: task.cancel()
+            for queue in queues.values(): queue.cancel_all()
+
+async def query_endpoint(request: Request):
+    """POST {"paradigm": "hierarchical|mcp|code", "query": "..."} -> NDJSON progress stream.
+    mcp and code share the MCP server's stock reservations; hierarchical reserves against this process's own
+    tools.STOCK_STORE, so its reservations are not visible to the other two (and vice versa)."""
+    try:
+        body = await request.json()
+    except ValueError:
+        return JSONResponse({"error": "Body must be a JSON object"}, status_code=400)
+    if not isinstance(body, dict):
+        return JSONResponse({"error": "Body must be a JSON object"}, status_code=400)
+    paradigm = body.get("paradigm", "mcp")
+    if paradigm not in queues:
+        return JSONResponse({"error": f"Unknown paradigm: {paradigm}", "paradigms": list(queues)}, status_code=400)
+    if not body.get("query"):
+        return JSONResponse({"error": "Missing query"}, status_code=400)
+
+    queue = queues[paradigm]
+    events = asyncio.Queue()
+    if not queue.submit(body["query"], events):
+        return JSONResponse({"error": "Queue full, retry later"}, status_code=429)
+
+    async def stream():
+        finished = False
+        try:
+            while (event := await events.get()) is not None:
+                yield json.dumps(event) + "\n"
+            finished = True
+        finally:
+            # client disconnected: give the slot back instead of running on until the budget stops it
+            if not finished: queue.cancel(events)
+
+    return StreamingResponse(stream(), media_type="application/x-ndjson")
+
+async def health_endpoint(request: Request):
+    return JSONResponse({
+        name: {"waiting": q.waiting(), "running": q.running, "limit": q.limit, **q.stats}
+        for name, q in queues.items()
+    })
+
+async def metrics_endpoint(request: Request):
+    """This process (queues, LLM calls, MCP round trips, in-process tools) in the Prometheus text format"""
+    return PlainTextResponse(render(), media_type="text/plain; version=0.0.4")
+
+async def server_metrics_endpoint(request: Request):
+    """Metrics of the MCP server behind a paradigm (tool pool, code execution, server-side tools)"""
+    paradigm = request.path_params["paradigm"]
+    if paradigm not in sessions:
+        return JSONResponse({"error": f"No MCP server for paradigm: {paradigm}", "paradigms": list(sessions)}, status_code=404)
+    with use_session(sessions[paradigm]):
+        text = await read_server_metrics()
+    return PlainTextResponse(text, media_type="text/plain; version=0.0.4")
+
+service = Starlette(
+    routes=[
+        Route("/query", query_endpoint, methods=["POST"]),
+        Route("/health", health_endpoint),
+        Route("/metrics", metrics_endpoint),
+        Route("/metrics/{paradigm}", server_metrics_endpoint)
+    ],
+    lifespan=lifespan
+)
+
+if __name__ == "__main__":
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description="Long-running agent service with warm graphs")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8100)
+    args = parser.parse_args()
+
+    uvicorn.run(service, host=args.host, port=args.port)
@@ -0,0 +1,56 @@
+import json
+import os
+import textwrap
+from collections import Counter
+
+from workload import iter_test_cases
+
+def append_json_array(path: str, item: dict):
+    """Appends to a JSON array file in place, so each write is O(1) and the file stays valid JSON after every case"""
+    entry = textwrap.indent(json.dumps(item, indent=2), "  ").encode()
+    if not os.path.exists(path) or os.path.getsize(path) == 0:
+        with open(path, 'wb') as f: f.write(b"[\n" + entry + b"\n]\n")
+        return
+
+    with open(path, 'r+b') as f:
+        size = f.seek(0, os.SEEK_END)
+        tail_start = max(0, size - 64)
+        f.seek(tail_start)
+        tail = f.read()
+        close = tail.rindex(b"]")
+        before = tail[:close].rstrip()
+        f.seek(tail_start + len(before))
+        f.truncate()
+        f.write((b"\n" if before.endswith(b"[") else b",\n") + entry + b"\n]\n")
+
+class AnswersLog:
+    """Answers file written one entry at a time; only running totals are kept in memory"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.count = 0
+        self.total_time = 0.0
+        self.total_tokens = 0
+        self.statuses = Counter()
+
+    def clear(self):
+        if os.path.exists(self.path): os.remove(self.path)
+
+    def append(self, entry: dict):
+        append_json_array(self.path, entry)
+        self.count += 1
+        self.total_time += entry.get("duration_seconds", 0)
+        self.total_tokens += entry.get("total_tokens", 0)
+        self.statuses[entry["status"]] += 1
+
+    def resume(self, keep) -> int:
+        """Keeps the existing entries for which keep(entry) is true (streamed, not loaded); returns how many"""
+        if not os.path.exists(self.path): return 0
+        partial = self.path + ".partial"
+        os.replace(self.path, partial)
+        try:
+            for entry in iter_test_cases(partial):
+                if keep(entry): self.append(entry)
+        finally:
+            os.remove(partial)
+        return self.count
@@ -0,0 +1,90 @@
+import argparse
+import asyncio
+import inspect
+import time
+
+from code_executor import LOCAL_FUNCTIONS, execute_local
+from load_test import percentile
+from mcp_client import DEFAULT_TRANSPORT, SERVER_URL, open_session
+from tools import READ_ONLY_TOOLS
+
+# Read-only scripts of the shape Code Mode produces, from one lookup up to a sweep over the catalog
+SCRIPTS = {
+    "1 call": 'print(get_part_id("Engine"))',
+    "3 hops": (
+        'pid = get_part_id("Windshield")\n'
+        'city = get_supplier_location(pid)\n'
+        'print(f"{city}: {get_shipping_cost(city)}")'
+    ),
+    "12 calls": (
+        'total = 0\n'
+        'for name in ["Engine", "Tyre", "Windshield", "Brake"]:\n'
+        '    pid = get_part_id(name)\n'
+        '    total += int(get_stock_level(pid))\n'
+        '    get_supplier_location(pid)\n'
+        'print(total)'
+    ),
+}
+
+def record_calls(code: str) -> list:
+    """The (MCP tool, arguments) sequence a script makes, for replaying it as one round trip per call"""
+    calls = []
+
+    def recorder(name, func):
+        mcp_name = READ_ONLY_TOOLS[name][0]
+        params = list(inspect.signature(func).parameters)
+
+        def record(*args):
+            calls.append((mcp_name, dict(zip(params, args))))
+            return func(*args)
+        return record
+
+    functions = {name: recorder(name, func) for name, func in LOCAL_FUNCTIONS.items() if name in READ_ONLY_TOOLS}
+    exec(code, {**functions, "print": lambda *args, **kwargs: None})
+    return calls
+
+async def time_path(run, repeats: int) -> list:
+    latencies = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        await run()
+        latencies.append(time.perf_counter() - start)
+    return latencies
+
+async def run_benchmark(args):
+    print(f"Per-script execution overhead, {args.repeats} runs per script ({args.transport} for the MCP paths)")
+    print("  local      : code_executor.execute_local in a warm worker process (what CODE_EXECUTOR=local does)")
+    print("  mcp script : execute_python_code over MCP, one round trip per script")
+    print("  mcp calls  : the same tool calls made one MCP round trip each (standard mode)")
+    print("-" * 78)
+    print(f"{'Script':<9} | {'Path':<10} | {'Round trips':<11} | {'Mean (ms)':<9} | {'p50 (ms)':<9} | {'p99 (ms)'}")
+    print("-" * 78)
+
+    async with open_session(args.transport, args.url) as session:
+        for label, code in SCRIPTS.items():
+            calls = record_calls(code)
+
+            async def local():
+                return await asyncio.to_thread(execute_local, code)
+
+            async def mcp_script():
+                return await session.call_tool("execute_python_code", arguments={"code": code})
+
+            async def mcp_calls():
+                for tool_name, arguments in calls:
+                    await session.call_tool(tool_name, arguments=arguments)
+
+            for path, run, round_trips in [("local", local, 0), ("mcp script", mcp_script, 1), ("mcp calls", mcp_calls, len(calls))]:
+                await run()  # warm-up
+                latencies = await time_path(run, args.repeats)
+                mean = sum(latencies) / len(latencies)
+                print(f"{label:<9} | {path:<10} | {round_trips:<11} | {mean * 1000:<9.2f} | "
+                      f"{percentile(latencies, 50) * 1000:<9.2f} | {percentile(latencies, 99) * 1000:.2f}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Code Mode script overhead: local executor vs MCP")
+    parser.add_argument("--transport", choices=["stdio", "sse"], default=DEFAULT_TRANSPORT)
+    parser.add_argument("--url", default=SERVER_URL)
+    parser.add_argument("--repeats", type=int, default=200)
+
+    asyncio.run(run_benchmark(parser.parse_args()))
@@ -0,0 +1,56 @@
+import argparse
+import threading
+import time
+
+from stock_store import StockStore
+
+AGENT_COUNTS = [1, 2, 4, 8, 16, 32, 64]
+
+def run_agents(store: StockStore, agents: int, ops: int, hot: bool, batch: int) -> float:
+    """Each agent reserves and releases one unit `ops` times; returns committed operations per second"""
+    barrier = threading.Barrier(agents + 1)
+
+    def agent(i):
+        part_id = "ID-HOT" if hot else f"ID-{i}"
+        order_id = f"order-{i}"
+        barrier.wait()
+        if batch <= 1:
+            for _ in range(ops):
+                store.reserve(part_id, 1, order_id)
+                store.release(part_id, 1, order_id)
+        else:
+            pairs = [("reserve", part_id, 1, order_id), ("release", part_id, 1, order_id)] * batch
+            for _ in range(ops // batch):
+                store.commit_batch(pairs)
+
+    threads = [threading.Thread(target=agent, args=(i,)) for i in range(agents)]
+    for t in threads: t.start()
+    barrier.wait()
+    start = time.time()
+    for t in threads: t.join()
+    elapsed = time.time() - start
+
+    committed = agents * (ops if batch <= 1 else (ops // batch) * batch) * 2
+    return committed / elapsed if elapsed > 0 else 0.0
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Reservation throughput as concurrent agents scale")
+    parser.add_argument("--ops", type=int, default=2000, help="reserve/release pairs per agent")
+    parser.add_argument("--batch", type=int, default=1, help="pairs per commit_batch (1 = unbatched)")
+    args = parser.parse_args()
+
+    stock = {"ID-HOT": 10 ** 9, **{f"ID-{i}": 10 ** 6 for i in range(max(AGENT_COUNTS))}}
+    modes = [("part locks", True), ("global lock", False)]
+
+    print(f"Reservation throughput (ops/s), {args.ops} pairs per agent, batch {args.batch}")
+    print("-" * 80)
+    print(f"{'Agents':<6} | " + " | ".join(f"{f'{label} {kind}':<22}" for label, _ in modes for kind in ["hot", "cold"]))
+    print("-" * 80)
+
+    for agents in AGENT_COUNTS:
+        row = []
+        for _, per_part in modes:
+            for hot in [True, False]:
+                store = StockStore(dict(stock), per_part_locks=per_part)
+                row.append(run_agents(store, agents, args.ops, hot, args.batch))
+        print(f"{agents:<6} | " + " | ".join(f"{r:<22,.0f}" for r in row))
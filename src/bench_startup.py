@@ -0,0 +1,64 @@
+import argparse
+import asyncio
+import os
+import subprocess
+import sys
+import time
+
+import mcp_client
+from mcp_client import MANIFEST_CACHE, build_agent, load_tool_manifest, open_session, server_version_hash
+
+def import_time(module: str) -> float:
+    """Wall time of a fresh interpreter importing `module`"""
+    start = time.time()
+    subprocess.run([sys.executable, "-c", f"import {module}"], check=True, capture_output=True)
+    return time.time() - start
+
+def reset_client_caches(keep_manifest: bool):
+    mcp_client._agent_cache.clear()
+    mcp_client.cached_schema_model.cache_clear()
+    if not keep_manifest and os.path.exists(MANIFEST_CACHE):
+        os.remove(MANIFEST_CACHE)
+
+async def client_setup(session, mode: str) -> float:
+    """Manifest + tool wrapping + graph compile, as done by mcp_server_context"""
+    start = time.time()
+    cache_key = f"stdio:{server_version_hash()}"
+    agent_key = (mode, "verbose", cache_key, False, "mcp")
+    if agent_key not in mcp_client._agent_cache:
+        manifest = await load_tool_manifest(session, cache_key)
+        mcp_client._agent_cache[agent_key] = build_agent(manifest, mode, "verbose")
+    return time.time() - start
+
+async def run_benchmark(repeats: int, mode: str):
+    print(f"Import time (fresh interpreter): mcp_client {import_time('mcp_client') * 1000:.0f} ms | "
+          f"mcp_server {import_time('mcp_server') * 1000:.0f} ms")
+
+    server_times = []
+    client_times = {"cold": [], "warm": [], "hot": []}
+
+    for i in range(repeats):
+        start = time.time()
+        async with open_session("stdio") as session:
+            server_times.append(time.time() - start)
+
+            # cold: nothing cached; warm: manifest on disk only (new process); hot: in-process caches too
+            reset_client_caches(keep_manifest=False)
+            client_times["cold"].append(await client_setup(session, mode))
+            reset_client_caches(keep_manifest=True)
+            client_times["warm"].append(await client_setup(session, mode))
+            client_times["hot"].append(await client_setup(session, mode))
+
+    print("-" * 60)
+    print(f"Server spawn + initialize: first {server_times[0] * 1000:.0f} ms, "
+          f"mean of rest {sum(server_times[1:]) / max(1, len(server_times) - 1) * 1000:.0f} ms")
+    for label, times in client_times.items():
+        print(f"Client setup ({label:<4}):       {sum(times) / len(times) * 1000:.1f} ms")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Client and server startup cost, cold vs warm")
+    parser.add_argument("--repeats", type=int, default=5)
+    parser.add_argument("--mode", choices=["standard", "code"], default="standard")
+    args = parser.parse_args()
+
+    asyncio.run(run_benchmark(args.repeats, args.mode))
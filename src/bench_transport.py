@@ -0,0 +1,51 @@
+import argparse
+import asyncio
+import time
+
+from load_test import percentile
+from mcp_client import SERVER_URL, open_session
+
+async def measure(transport: str, url: str, calls: int, repeats: int) -> dict:
+    """Startup = connect + initialize + list_tools; per-call = sequential find_part_id round trips"""
+    startups = []
+    latencies = []
+
+    for _ in range(repeats):
+        start = time.time()
+        async with open_session(transport, url) as session:
+            await session.list_tools()
+            startups.append(time.time() - start)
+
+            for _ in range(calls):
+                call_start = time.time()
+                await session.call_tool("find_part_id", arguments={"part_name": "Engine"})
+                latencies.append(time.time() - call_start)
+
+    return {
+        "startup_mean": sum(startups) / len(startups),
+        "call_p50": percentile(latencies, 50),
+        "call_p99": percentile(latencies, 99)
+    }
+
+async def run_benchmark(args):
+    print(f"Comparing stdio (private subprocess) with sse ({args.url}).")
+    print("Start the shared server first: python mcp_server.py --transport sse")
+    print("-" * 70)
+    print(f"{'Transport':<10} | {'Startup (ms)':<12} | {'Call p50 (ms)':<13} | {'Call p99 (ms)'}")
+    print("-" * 70)
+
+    for transport in ["stdio", "sse"]:
+        try:
+            r = await measure(transport, args.url, args.calls, args.repeats)
+        except Exception as e:
+            print(f"{transport:<10} | failed: {e}")
+            continue
+        print(f"{transport:<10} | {r['startup_mean'] * 1000:<12.1f} | {r['call_p50'] * 1000:<13.2f} | {r['call_p99'] * 1000:.2f}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Startup and per-call overhead of stdio vs shared sse transport")
+    parser.add_argument("--url", default=SERVER_URL)
+    parser.add_argument("--calls", type=int, default=200)
+    parser.add_argument("--repeats", type=int, default=5)
+
+    asyncio.run(run_benchmark(parser.parse_args()))
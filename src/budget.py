@@ -0,0 +1,84 @@
+from contextlib import contextmanager
+from contextvars import ContextVar
+import sqlite3
+import time
+
+from langchain_core.callbacks import BaseCallbackHandler
+
+CHECKPOINT_DB = "../test/checkpoints.sqlite"
+
+# Budget of the case currently running; graph nodes inherit it through the copied context
+_current_budget = ContextVar("budget", default=None)
+
+class BudgetExceeded(Exception):
+    """Raised between graph nodes when a case runs out of LLM calls, tokens or time"""
+
+    def __init__(self, reason: str, usage: dict):
+        super().__init__(reason)
+        self.reason = reason
+        self.usage = usage
+
+class Budget(BaseCallbackHandler):
+    """Per-case limits (None = unlimited); counts every LLM call through the callback system"""
+
+    def __init__(self, max_llm_calls: int = None, max_tokens: int = None, max_seconds: float = None):
+        self.max_llm_calls = max_llm_calls
+        self.max_tokens = max_tokens
+        self.max_seconds = max_seconds
+        self.llm_calls = 0
+        self.tokens = 0
+        self.started = time.time()
+
+    def on_llm_end(self, response, **kwargs):
+        self.llm_calls += 1
+        for generations in response.generations:
+            for generation in generations:
+                usage = getattr(getattr(generation, "message", None), "usage_metadata", None) or {}
+                self.tokens += usage.get("total_tokens", 0)
+
+    def usage(self) -> dict:
+        return {"llm_calls": self.llm_calls, "tokens": self.tokens, "seconds": round(time.time() - self.started, 2)}
+
+    def check(self):
+        elapsed = time.time() - self.started
+        if self.max_llm_calls is not None and self.llm_calls >= self.max_llm_calls:
+            raise BudgetExceeded(f"LLM call budget exhausted ({self.llm_calls}/{self.max_llm_calls})", self.usage())
+        if self.max_tokens is not None and self.tokens >= self.max_tokens:
+            raise BudgetExceeded(f"Token budget exhausted ({self.tokens}/{self.max_tokens})", self.usage())
+        if self.max_seconds is not None and elapsed >= self.max_seconds:
+            raise BudgetExceeded(f"Time budget exhausted ({elapsed:.0f}s/{self.max_seconds:.0f}s)", self.usage())
+
+    @contextmanager
+    def active(self):
+        """Makes this the budget checked by with_budget nodes for the enclosed run"""
+        token = _current_budget.set(self)
+        try:
+            yield self
+        finally:
+            _current_budget.reset(token)
+
+def run_config(budget: Budget = None, thread_id: str = None, recursion_limit: int = None) -> dict:
+    """Graph config: the budget as LLM callback, plus an optional checkpoint thread"""
+    config = {}
+    if budget is not None: config["callbacks"] = [budget]
+    if thread_id: config["configurable"] = {"thread_id": thread_id}
+    if recursion_limit: config["recursion_limit"] = recursion_limit
+    return config
+
+def with_budget(node):
+    """Wraps a graph node so the active budget is checked before it starts"""
+    def guarded(state):
+        budget = _current_budget.get()
+        if budget is not None: budget.check()
+        return node(state)
+    guarded.__name__ = node.__name__
+    return guarded
+
+def sync_checkpointer():
+    from langgraph.checkpoint.sqlite import SqliteSaver
+    return SqliteSaver(sqlite3.connect(CHECKPOINT_DB, check_same_thread=False))
+
+async def async_checkpointer():
+    import aiosqlite
+    from langgraph.checkpoint.sqlite.aio import AsyncSqliteSaver
+    return AsyncSqliteSaver(await aiosqlite.connect(CHECKPOINT_DB))
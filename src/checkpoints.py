@@ -0,0 +1,47 @@
+import asyncio
+import sys
+
+from budget import Budget, run_config, sync_checkpointer
+
+USAGE = "Usage: python checkpoints.py show <thread_id> | resume <thread_id> [max_seconds]"
+
+def show(thread_id: str):
+    """Prints the messages stored in the latest checkpoint of a thread"""
+    saved = sync_checkpointer().get_tuple({"configurable": {"thread_id": thread_id}})
+    if saved is None:
+        print(f"No checkpoint for thread {thread_id}")
+        return
+    messages = saved.checkpoint["channel_values"].get("messages", [])
+    print(f"Thread {thread_id}: {len(messages)} messages, step {saved.metadata.get('step')}")
+    for m in messages:
+        calls = getattr(m, "tool_calls", None)
+        print(f"[{m.type}] {calls if calls else str(m.content)[:200]}")
+
+def resume_hierarchical(thread_id: str, budget: Budget):
+    from agent_graph import resume_hierarchical_agent
+    answer, _ = resume_hierarchical_agent(thread_id, budget)
+    print(f"Agent: {answer}")
+
+async def resume_mcp(thread_id: str, budget: Budget):
+    from mcp_client import mcp_server_context
+    mode = "code" if thread_id.startswith("code-") else "standard"
+    async with mcp_server_context(mode=mode, checkpoint=True) as agent:
+        with budget.active():
+            result = await agent.ainvoke(None, run_config(budget, thread_id))
+    print(f"Agent: {result['messages'][-1].content}")
+
+if __name__ == "__main__":
+    if len(sys.argv) < 3 or sys.argv[1] not in ["show", "resume"]:
+        print(USAGE)
+        sys.exit(1)
+
+    command, thread_id = sys.argv[1], sys.argv[2]
+    if command == "show":
+        show(thread_id)
+    else:
+        budget = Budget(max_seconds=float(sys.argv[3]) if len(sys.argv) > 3 else None)
+        if thread_id.startswith("hier-"):
+            resume_hierarchical(thread_id, budget)
+        else:
+            asyncio.run(resume_mcp(thread_id, budget))
+        print(f"Usage: {budget.usage()}")
@@ -0,0 +1,250 @@
+import ast
+import builtins
+from concurrent.futures import ProcessPoolExecutor, TimeoutError as FuturesTimeout
+from concurrent.futures.process import BrokenProcessPool
+import contextlib
+import io
+import multiprocessing
+import os
+import signal
+import sys
+import threading
+import time
+import traceback
+
+from metrics import Counter, Histogram
+from tools import get_part_id, get_stock_level, get_supplier_location, get_shipping_cost
+from tools import reserve_stock, release_stock, transfer_reservation, STOCK_STORE
+
+LOOKUP_FUNCTIONS_DOC = """    - get_part_id(part_name: str) -> str
+    - get_stock_level(part_id: str) -> str
+    - get_supplier_location(part_id: str) -> str
+    - get_shipping_cost(city: str) -> str"""
+
+RESERVATION_FUNCTIONS_DOC = """    - reserve_stock(part_id: str, quantity: int, order_id: str) -> str
+    - release_stock(part_id: str, quantity: int, order_id: str) -> str
+    - transfer_reservation(part_id: str, quantity: int, from_order_id: str, to_order_id: str) -> str"""
+
+CODE_TOOL_TEMPLATE = """
+    Executes a Python script to answer complex SCM questions.
+
+    AVAILABLE FUNCTIONS (Already imported):
+{functions}
+
+    USAGE:
+    - Write a script that calls these functions to solve the problem.
+    - You MUST use print() to output the final answer or intermediate results.
+    - Do not import these functions; they are pre-loaded.
+
+    Example:
+      pid = get_part_id("Engine")
+      loc = get_supplier_location(pid)
+      print(f"Location is {{loc}}")
+    """
+
+CODE_TOOL_DESCRIPTION = CODE_TOOL_TEMPLATE.format(functions=LOOKUP_FUNCTIONS_DOC + "\n" + RESERVATION_FUNCTIONS_DOC)
+LOCAL_CODE_TOOL_DESCRIPTION = CODE_TOOL_TEMPLATE.format(functions=LOOKUP_FUNCTIONS_DOC)
+
+# tools.py functions under their own names and the MCP server's tool names
+SCRIPT_FUNCTIONS = {
+    "get_part_id": get_part_id,
+    "find_part_id": get_part_id,
+    "get_stock_level": get_stock_level,
+    "check_stock": get_stock_level,
+    "get_supplier_location": get_supplier_location,
+    "find_supplier_city": get_supplier_location,
+    "get_shipping_cost": get_shipping_cost,
+    "calculate_shipping": get_shipping_cost,
+    "reserve_stock": reserve_stock,
+    "reserve_parts": reserve_stock,
+    "release_stock": release_stock,
+    "release_parts": release_stock,
+    "transfer_reservation": transfer_reservation,
+    "transfer_parts": transfer_reservation,
+}
+
+# Local scripts only get the lookups: the worker process has its own STOCK_STORE, so reservations made there
+# would diverge from the store the reservation tools use. execute_local copies that store's reservations in
+# before each script, so stock levels still show them.
+LOCAL_FUNCTIONS = {name: func for name, func in SCRIPT_FUNCTIONS.items()
+                   if func not in (reserve_stock, release_stock, transfer_reservation)}
+
+# Local scripts run in a pool of worker processes; a script still running after LOCAL_TIMEOUT is stopped
+LOCAL_WORKERS = int(os.environ.get("CODE_EXEC_WORKERS", "4"))
+LOCAL_TIMEOUT = float(os.environ.get("CODE_EXEC_TIMEOUT", "30"))
+# Extra wait, from the script's start, before a worker that ignored its timer is killed
+KILL_GRACE = 5.0
+
+# Local scripts may only import these, and are checked before they run (see check_script)
+ALLOWED_MODULES = {"math", "json", "re", "statistics", "collections", "itertools", "functools", "datetime"}
+BLOCKED_BUILTINS = {"open", "exec", "eval", "compile", "input", "breakpoint", "exit", "quit", "help", "globals", "vars",
+                    "getattr", "setattr", "delattr"}
+# Besides _private and __dunder__ names: frame, traceback and generator internals that lead to module globals
+BLOCKED_ATTRIBUTES = {"gi_frame", "gi_code", "cr_frame", "cr_code", "ag_frame", "ag_code",
+                      "f_globals", "f_locals", "f_builtins", "f_back", "tb_frame", "tb_next"}
+
+CODE_EXEC_LATENCY = Histogram("scm_code_exec_seconds", "Code Mode script execution time", ("executor",))
+CODE_EXEC_RUNS = Counter("scm_code_exec_total", "Code Mode scripts by outcome (ok, no_output, runtime_error, rejected, timeout, crashed)", ("executor", "outcome"))
+
+class ThreadLocalStdout:
+    """sys.stdout stand-in: a thread running a script writes to its own buffer, everything else passes through"""
+
+    def __init__(self, stream):
+        self._stream = stream
+        self._local = threading.local()
+
+    @contextlib.contextmanager
+    def capture(self, buffer):
+        self._local.buffer = buffer
+        try:
+            yield buffer
+        finally:
+            self._local.buffer = None
+
+    def write(self, text):
+        return (getattr(self._local, "buffer", None) or self._stream).write(text)
+
+    def flush(self):
+        if getattr(self._local, "buffer", None) is None: self._stream.flush()
+
+    def __getattr__(self, name):
+        return getattr(self._stream, name)
+
+_install_lock = threading.Lock()
+
+def stdout_proxy() -> ThreadLocalStdout:
+    """Installs the proxy once instead of redirect_stdout, which swaps the process-global stream per call.
+    Re-installs if something (e.g. pytest capture) replaced sys.stdout since."""
+    with _install_lock:
+        if not isinstance(sys.stdout, ThreadLocalStdout):
+            sys.stdout = ThreadLocalStdout(sys.stdout)
+        return sys.stdout
+
+class ScriptTimeout(BaseException):
+    """Raised in a local script by its timer; a BaseException so the script's own except Exception can't swallow it"""
+
+def _guarded_import(name, globals=None, locals=None, fromlist=(), level=0):
+    if level != 0 or name.split(".")[0] not in ALLOWED_MODULES:
+        raise ImportError(f"Import of '{name}' is not allowed in Code Mode scripts.")
+    return builtins.__import__(name, globals, locals, fromlist, level)
+
+LOCAL_BUILTINS = {k: v for k, v in vars(builtins).items() if k not in BLOCKED_BUILTINS}
+LOCAL_BUILTINS["__import__"] = _guarded_import
+
+def check_script(code: str):
+    """Raises SyntaxError or ValueError for scripts that reach for private attributes or dunder names"""
+    for node in ast.walk(ast.parse(code)):
+        attributes = []
+        if isinstance(node, ast.Attribute): attributes = [node.attr]
+        elif isinstance(node, ast.MatchClass): attributes = node.kwd_attrs
+        for attr in attributes:
+            if attr.startswith("_") or attr in BLOCKED_ATTRIBUTES:
+                raise ValueError(f"Access to attribute '{attr}' is not allowed in Code Mode scripts.")
+        if isinstance(node, ast.Name) and node.id.startswith("__"):
+            raise ValueError(f"Access to name '{node.id}' is not allowed in Code Mode scripts.")
+
+def _execute(code: str, functions: dict, script_builtins: dict = None) -> tuple:
+    """(outcome, output) of running a script on the calling thread, capturing only this script's output"""
+    script_globals = {**functions, "print": print}
+    if script_builtins is not None: script_globals["__builtins__"] = script_builtins
+
+    try:
+        with stdout_proxy().capture(io.StringIO()) as output_capture:
+            exec(code, script_globals)
+
+        result = output_capture.getvalue()
+        if not result.strip():
+            return "no_output", "Code executed successfully but printed no output. Did you forget print()?"
+        return "ok", result
+
+    except ScriptTimeout:
+        return "timeout", f"TIMEOUT: the script ran longer than {LOCAL_TIMEOUT:.0f} seconds."
+    except Exception:
+        return "runtime_error", f"RUNTIME ERROR:\n{traceback.format_exc()}"
+
+def _observed(executor: str, run) -> str:
+    """Output of run() -> (outcome, output), recorded in the Code Mode metrics"""
+    start = time.perf_counter()
+    try:
+        outcome, result = run()
+        CODE_EXEC_RUNS.inc(executor=executor, outcome=outcome)
+        return result
+    finally:
+        CODE_EXEC_LATENCY.observe(time.perf_counter() - start, executor=executor)
+
+def run_script(code: str) -> str:
+    """Runs a Code Mode script on the calling thread (the MCP server's tool pool)"""
+    return _observed("mcp", lambda: _execute(code, SCRIPT_FUNCTIONS))
+
+def _raise_timeout(signum, frame):
+    raise ScriptTimeout()
+
+def _run_in_worker(code: str, reserved: dict) -> tuple:
+    """Worker-process side of execute_local: checks the script, loads the reservations, then runs it under a timer"""
+    try:
+        check_script(code)
+    except (SyntaxError, ValueError) as e:
+        return "rejected", f"REJECTED: {e}"
+
+    STOCK_STORE.load(reserved)
+
+    # pool workers run tasks on their main thread, so the interval timer can interrupt the script
+    signal.signal(signal.SIGALRM, _raise_timeout)
+    signal.setitimer(signal.ITIMER_REAL, LOCAL_TIMEOUT)
+    try:
+        return _execute(code, LOCAL_FUNCTIONS, LOCAL_BUILTINS)
+    finally:
+        signal.setitimer(signal.ITIMER_REAL, 0)
+
+def _worker_ready() -> int:
+    return os.getpid()
+
+_pool = None
+_pool_lock = threading.Lock()
+# One script per worker: a script holding a slot starts at once, so the kill deadline only counts its run time
+_worker_slots = threading.BoundedSemaphore(LOCAL_WORKERS)
+
+def _local_pool() -> ProcessPoolExecutor:
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            # spawn: forking a process that runs an event loop and thread pools is unsafe
+            _pool = ProcessPoolExecutor(max_workers=LOCAL_WORKERS, mp_context=multiprocessing.get_context("spawn"))
+            # start every worker now, so process start-up never counts against a script's deadline
+            for ready in [_pool.submit(_worker_ready) for _ in range(LOCAL_WORKERS)]: ready.result()
+        return _pool
+
+def _discard_pool(pool: ProcessPoolExecutor):
+    """Kills a pool whose worker ignored its timer or died; the next script starts a fresh one.
+    Scripts running on its other workers fail with a crashed outcome."""
+    global _pool
+    with _pool_lock:
+        if _pool is pool: _pool = None
+    # ProcessPoolExecutor has no public way to stop a busy worker
+    for process in list((pool._processes or {}).values()): process.kill()
+    pool.shutdown(wait=False, cancel_futures=True)
+
+def execute_local(code: str, reserved: dict = None) -> str:
+    """Local executor: runs the script in a worker process with the tools.py lookups bound directly, no MCP round trip.
+    reserved: the reservations the script's stock levels reflect (STOCK_STORE.snapshot()), by default this process's"""
+    if reserved is None: reserved = STOCK_STORE.snapshot()
+
+    def run():
+        with _worker_slots:
+            try:
+                pool = _local_pool()
+                return pool.submit(_run_in_worker, code, reserved).result(timeout=LOCAL_TIMEOUT + KILL_GRACE)
+            except FuturesTimeout:
+                # the worker's own timer normally stops the script at LOCAL_TIMEOUT; this one ignored it
+                _discard_pool(pool)
+                return "timeout", f"TIMEOUT: the script ran longer than {LOCAL_TIMEOUT + KILL_GRACE:.0f} seconds and was killed."
+            except BrokenProcessPool:
+                _discard_pool(pool)
+                return "crashed", "RUNTIME ERROR: the worker process running the script exited."
+    return _observed("local", run)
+
+def local_code_tool():
+    """execute_python_code as a LangChain tool backed by the local executor"""
+    from langchain_core.tools import StructuredTool
+
+    return StructuredTool.from_function(func=execute_local, name="execute_python_code", description=LOCAL_CODE_TOOL_DESCRIPTION)
@@ -0,0 +1,34 @@
+import json
+import os
+
+from compare_schema_modes import summarize
+from few_shot import dynamic_examples, estimate_tokens, static_examples
+
+FEW_SHOT_FILES = {
+    "static": "../test/answers_orchestration.json",
+    "dynamic": "../test/answers_orchestration_dynamic.json"
+}
+
+def prompt_tokens(mode: str, questions: list) -> float:
+    """Average estimated few-shot block size per worker prompt"""
+    sizes = []
+    for worker in ["inventory", "logistics"]:
+        for q in questions:
+            block = dynamic_examples(worker, q) if mode == "dynamic" else static_examples(worker)
+            sizes.append(estimate_tokens(block))
+    return sum(sizes) / len(sizes) if sizes else 0.0
+
+if __name__ == "__main__":
+    with open('../test/test_set.json', 'r') as f: questions = [c["q"] for c in json.load(f)]
+
+    print(f"{'Mode':<8} | {'Shot tok':<8} | {'Cases':<5} | {'Pass':<6} | {'Avg in tok':<10} | {'Avg time (s)'}")
+    print("-" * 70)
+
+    for mode, filepath in FEW_SHOT_FILES.items():
+        shots = prompt_tokens(mode, questions)
+        s = summarize(filepath) if os.path.exists(filepath) else {}
+        if not s:
+            print(f"{mode:<8} | {shots:<8.0f} | no answers ({filepath})")
+            continue
+        print(f"{mode:<8} | {shots:<8.0f} | {s['cases']:<5} | {s['pass_rate']:<6.0%} | "
+              f"{s['avg_input_tokens']:<10.0f} | {s['avg_duration']:.2f}")
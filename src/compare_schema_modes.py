@@ -0,0 +1,68 @@
+import asyncio
+import json
+import os
+
+from langchain_core.tools import StructuredTool
+from langchain_core.utils.function_calling import convert_to_openai_tool
+
+from benchmark import count_tokens
+from evaluate import answers_file_for as hierarchical_answers_file_for
+from evaluate_mcp import answers_file_for
+from mcp_client import load_tool_manifest, manifest_tool_specs, open_session, server_version_hash
+from tool_schema import SCHEMA_MODES, compact_tools
+from tools import get_part_id, get_shipping_cost, get_stock_level, get_supplier_location
+from tools import release_stock, reserve_stock, transfer_reservation
+
+# Tools bound by the hierarchical workers (agent_graph.py)
+WORKER_TOOLS = [get_part_id, get_stock_level, get_supplier_location, get_shipping_cost,
+                reserve_stock, release_stock, transfer_reservation]
+
+async def load_manifest() -> list:
+    """The MCP server's tool manifest (from MANIFEST_CACHE when the server sources are unchanged)"""
+    async with open_session("stdio") as session:
+        return await load_tool_manifest(session, f"stdio:{server_version_hash()}")
+
+def schema_tokens(manifest: list, mode: str) -> int:
+    """Tokens of the serialized tool schemas evaluate_mcp.py's agent sends with every request in this mode"""
+    tools = [StructuredTool.from_function(func=lambda **kwargs: None, **spec)
+             for spec in manifest_tool_specs(manifest, "standard", mode)]
+    return count_tokens(json.dumps([convert_to_openai_tool(t) for t in tools]))
+
+def worker_schema_tokens(mode: str) -> int:
+    """Same for the tools.py functions bound by the hierarchical workers"""
+    schemas = [convert_to_openai_tool(t) for t in compact_tools(WORKER_TOOLS, mode)]
+    return count_tokens(json.dumps(schemas))
+
+def summarize(filepath: str) -> dict:
+    with open(filepath, 'r') as f: data = json.load(f)
+    if not data: return {}
+    return {
+        "cases": len(data),
+        "pass_rate": len([d for d in data if d.get("status") == "PASS"]) / len(data),
+        "avg_input_tokens": sum(d.get("input_tokens", 0) for d in data) / len(data),
+        "avg_duration": sum(d.get("duration_seconds", 0) for d in data) / len(data)
+    }
+
+def print_table(title: str, rows: list):
+    print(f"\n{title}")
+    print(f"{'Mode':<8} | {'Schema tok':<10} | {'Cases':<5} | {'Pass':<6} | {'Avg in tok':<10} | {'Avg time (s)'}")
+    print("-" * 70)
+
+    for mode, tokens, filepath in rows:
+        if not os.path.exists(filepath):
+            print(f"{mode:<8} | {tokens:<10} | no answers file ({filepath})")
+            continue
+
+        s = summarize(filepath)
+        if not s:
+            print(f"{mode:<8} | {tokens:<10} | empty answers file")
+            continue
+        print(f"{mode:<8} | {tokens:<10} | {s['cases']:<5} | {s['pass_rate']:<6.0%} | "
+              f"{s['avg_input_tokens']:<10.0f} | {s['avg_duration']:.2f}")
+
+if __name__ == "__main__":
+    manifest = asyncio.run(load_manifest())
+    print_table("MCP agent (python evaluate_mcp.py <mode>)",
+                [(mode, schema_tokens(manifest, mode), answers_file_for(mode)) for mode in SCHEMA_MODES])
+    print_table("Hierarchical workers (TOOL_SCHEMA_MODE=<mode> python -m pytest evaluate.py)",
+                [(mode, worker_schema_tokens(mode), hierarchical_answers_file_for(tool_schema_mode=mode)) for mode in SCHEMA_MODES])
@@ -1,31 +1,48 @@
-import json
 import logging
 import os
 import time
 
 import pytest
+from langchain_core.messages import AIMessage
+from langgraph.errors import GraphRecursionError
 
-from agent_graph import run_hierarchical_agent
+from agent_graph import FEW_SHOT_MODE, ROUTING_STATS, TOOL_SCHEMA_MODE, reset_routing_stats, run_hierarchical_agent
+from answers_log import AnswersLog
 from benchmark import count_tokens
+from budget import Budget, BudgetExceeded
+from memory_profile import MEMORY_PROFILE, MemoryProfiler
+from metrics import METRICS_PORT, dump_metrics, metrics_file_for, serve_metrics
+from workload import DEFAULT_TEST_SET, iter_test_cases, test_set_suffix
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger("Eval")
 
-ANSWERS_FILE = "../test/answers_orchestration.json"
+TEST_SET_FILE = os.environ.get("TEST_SET", DEFAULT_TEST_SET)
+
+def answers_file_for(few_shot_mode=FEW_SHOT_MODE, tool_schema_mode=TOOL_SCHEMA_MODE):
+    """Default modes on the committed test set keep the original answers file, anything else gets suffixes"""
+    suffix = "".join(f"_{mode}" for mode, default in [(few_shot_mode, "static"), (tool_schema_mode, "verbose")] if mode != default)
+    return f"../test/answers_orchestration{suffix}{test_set_suffix(TEST_SET_FILE)}.json"
+
+# FEW_SHOT_MODE=dynamic, TOOL_SCHEMA_MODE=compact or TEST_SET=<generated set> python -m pytest evaluate.py
+# writes a separate answers file for comparison
+ANSWERS_FILE = answers_file_for()
+ANSWERS = AnswersLog(ANSWERS_FILE)
+
+# Per-case budget for the hierarchical graph, checked between nodes
+MAX_LLM_CALLS = 20
+MAX_TOKENS = 60000
+MAX_SECONDS = 300.0
+
+# MEMORY_PROFILE=1 adds a per-case "memory" record (no server process in this paradigm)
+PROFILER = MemoryProfiler() if MEMORY_PROFILE else None
 
 def load_test_cases():
-    with open('../test/test_set.json', 'r') as f: return json.load(f)
+    return iter_test_cases(TEST_SET_FILE)
 
-def log_debug(case, actual, status, output_tokens=0, duration=0.0, msg=""):
-    """Writes down the answers with timing metrics"""
-    logs = []
-    if os.path.exists(ANSWERS_FILE):
-        try:
-            with open(ANSWERS_FILE, 'r') as f: logs = json.load(f)
-        except: pass
-    
-    previous_total = sum(item.get("duration_seconds", 0) for item in logs)
-    total_accumulated = previous_total + duration
+def log_debug(case, actual, status, output_tokens=0, duration=0.0, msg="", input_tokens=0):
+    """Appends the answer with timing metrics"""
+    total_accumulated = ANSWERS.total_time + duration
 
     entry = {
         "id": case['id'], 
@@ -33,18 +50,26 @@ def log_debug(case, actual, status, output_tokens=0, duration=0.0, msg=""):
         "exp": case['expected'], 
         "act": actual, 
         "status": status,
+        "input_tokens": input_tokens,
         "output_tokens": output_tokens,
+        "few_shot": FEW_SHOT_MODE,
+        "tool_schema": TOOL_SCHEMA_MODE,
         "duration_seconds": round(duration, 2),       
         "cumulative_time_seconds": round(total_accumulated, 2), 
-        "err": msg
+        "err": msg,
+        "routing": dict(ROUTING_STATS)
     }
+    if PROFILER: entry["memory"] = PROFILER.end_case(case['id'])
     
-    logs.append(entry)
-    with open(ANSWERS_FILE, 'w') as f: json.dump(logs, f, indent=2)
+    ANSWERS.append(entry)
 
 @pytest.fixture(scope="session", autouse=True)
 def clear_log():
-    if os.path.exists(ANSWERS_FILE): os.remove(ANSWERS_FILE)
+    ANSWERS.clear()
+    if METRICS_PORT: serve_metrics(METRICS_PORT)
+    yield
+    if PROFILER: print(f"\n{PROFILER.summary()}")
+    dump_metrics(metrics_file_for(ANSWERS_FILE))
 
 @pytest.mark.parametrize("case", load_test_cases())
 def test_supervisor_agent(case):
@@ -53,11 +78,23 @@ def test_supervisor_agent(case):
     
     final_out = ""
     out_tokens = 0
+    in_tokens = 0
     start_time = time.time()
+    reset_routing_stats()
+    if PROFILER: PROFILER.start_case()
+    
+    budget = Budget(MAX_LLM_CALLS, MAX_TOKENS, MAX_SECONDS)
+    thread_id = f"hier-{case['id']}-{int(start_time)}"
     
     try:
-        final_out, history = run_hierarchical_agent(case["q"])
+        final_out, history = run_hierarchical_agent(case["q"], budget=budget, thread_id=thread_id)
         out_tokens = count_tokens(final_out) 
+        in_tokens = sum((m.usage_metadata or {}).get("input_tokens", 0) for m in history if isinstance(m, AIMessage))
+    except (BudgetExceeded, GraphRecursionError) as e:
+        duration = time.time() - start_time
+        reason = e.reason if isinstance(e, BudgetExceeded) else "Recursion limit reached"
+        log_debug(case, reason, "BUDGET", 0, duration, f"{reason} (thread {thread_id})")
+        pytest.fail(f"Budget exhausted: {reason}")
     except Exception as e:
         duration = time.time() - start_time
         log_debug(case, str(e), "CRASH", 0, duration, str(e))
@@ -67,8 +104,8 @@ def test_supervisor_agent(case):
     exp = case["expected"].lower()
     
     if exp in final_out.lower():
-        log_debug(case, final_out, "PASS", out_tokens, duration)
+        log_debug(case, final_out, "PASS", out_tokens, duration, input_tokens=in_tokens)
     else:
         msg = f"Missing keyword '{exp}'"
-        log_debug(case, final_out, "FAIL", out_tokens, duration, msg)
+        log_debug(case, final_out, "FAIL", out_tokens, duration, msg, in_tokens)
         pytest.fail(msg)
\ No newline at end of file
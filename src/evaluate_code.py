@@ -1,5 +1,4 @@
 import asyncio
-import json
 import os
 import requests
 import sys
@@ -7,7 +6,12 @@ import time
 
 from langchain_core.messages import AIMessage, HumanMessage, SystemMessage
 
-from mcp_client import mcp_server_context
+from budget import Budget, BudgetExceeded, run_config
+from mcp_client import CODE_EXECUTOR, mcp_server_context, read_server_metrics, read_server_stats
+from memory_profile import MEMORY_PROFILE, MemoryProfiler
+from metrics import METRICS_PORT, dump_metrics, metrics_file_for, serve_metrics
+from answers_log import AnswersLog
+from workload import DEFAULT_TEST_SET, iter_test_cases, test_set_suffix
 
 SYSTEM_PROMPT = """You are an expert SCM Python Engineer.
 Instead of calling tools one by one, you MUST write a Python script to solve the user's problem.
@@ -25,18 +29,27 @@ STRATEGY:
 3. Use `print()` to output the final answer.
 """
 
-ANSWERS_FILE = "../test/answers_code_qwen.json"
 MODEL_NAME = "qwen2.5:14B"
+TEST_SET_FILE = os.environ.get("TEST_SET", DEFAULT_TEST_SET)
+# CODE_EXECUTOR=local and TEST_SET=<generated set> write separate answers files instead of the baseline
+EXECUTOR_SUFFIX = "" if CODE_EXECUTOR == "mcp" else f"_{CODE_EXECUTOR}"
+ANSWERS_FILE = f"../test/answers_code_qwen{EXECUTOR_SUFFIX}{test_set_suffix(TEST_SET_FILE)}.json"
+
+# Per-case budget, checked between graph nodes; exhausted cases are logged as BUDGET and stay resumable
+MAX_LLM_CALLS = 12
+MAX_TOKENS = 20000
+MAX_SECONDS = 300.0
+# Backstop for a single LLM call hanging past the budget
+HARD_TIMEOUT = MAX_SECONDS + 120.0
 
 def load_test_cases():
-    with open('../test/test_set.json', 'r') as f: return json.load(f)
+    """Streams cases so large generated test sets are not held in memory"""
+    return iter_test_cases(TEST_SET_FILE)
 
-def log_debug(logs, case, actual, status, duration, input_tokens, output_tokens, total_tokens):
-    previous_total_time = sum(item.get("duration_seconds", 0) for item in logs)
-    total_accumulated_time = previous_total_time + duration
-
-    previous_total_tokens = sum(item.get("total_tokens", 0) for item in logs)
-    total_accumulated_tokens = previous_total_tokens + total_tokens
+def log_debug(answers, case, actual, status, duration, input_tokens, output_tokens, total_tokens, thread_id=""):
+    """Answers entry with running totals; appended once the case's memory record (if any) is added"""
+    total_accumulated_time = answers.total_time + duration
+    total_accumulated_tokens = answers.total_tokens + total_tokens
 
     entry = {
         "id": case['id'], 
@@ -49,11 +62,11 @@ def log_debug(logs, case, actual, status, duration, input_tokens, output_tokens,
         "total_tokens": total_tokens,
         "cumulative_total_tokens": total_accumulated_tokens,
         "duration_seconds": round(duration, 2),
-        "cumulative_time_seconds": round(total_accumulated_time, 2)
+        "cumulative_time_seconds": round(total_accumulated_time, 2),
+        "thread_id": thread_id
     }
     
-    logs.append(entry)
-    with open(ANSWERS_FILE, 'w') as f: json.dump(logs, f, indent=2)
+    return entry
 
 def calculate_tokens(messages):
     """Helper to sum tokens from a list of messages."""
@@ -81,38 +94,33 @@ async def run_evaluation():
             return
 
     cases = load_test_cases()
-    logs = []
+    answers = AnswersLog(ANSWERS_FILE)
 
-    # Load and Filter Existing Logs
+    # Keep existing answers before start_id (streamed, so large runs are not loaded at once)
     if os.path.exists(ANSWERS_FILE):
         try:
-            with open(ANSWERS_FILE, 'r') as f:
-                logs = json.load(f)
-            print(f"Loaded {len(logs)} existing answers from {ANSWERS_FILE}")
-            
-            original_count = len(logs)
-            logs = [l for l in logs if l['id'] < start_id]
-            
-            if len(logs) < original_count:
-                print(f"Truncated logs to {len(logs)} entries (keeping IDs < {start_id})")
-                
-        except json.JSONDecodeError:
+            kept = answers.resume(lambda l: l['id'] < start_id)
+            print(f"Kept {kept} existing answers from {ANSWERS_FILE} (IDs < {start_id})")
+        except ValueError:
             print("Could not parse existing answers file. Starting fresh.")
-            logs = []
+            answers = AnswersLog(ANSWERS_FILE)
+            answers.clear()
     
     # Filter Cases to Run
-    cases_to_run = [c for c in cases if c['id'] >= start_id]
-    
-    if not cases_to_run:
-        print("No questions left to evaluate based on start ID.")
-        return
+    cases_to_run = (c for c in cases if c['id'] >= start_id)
 
-    print(f"Evaluating {len(cases_to_run)} cases in CODE MODE ({MODEL_NAME})...")
+    print(f"Evaluating {TEST_SET_FILE} from Q{start_id} in CODE MODE ({MODEL_NAME})...")
     
-    async with mcp_server_context(mode="code") as agent:
+    profiler = MemoryProfiler() if MEMORY_PROFILE else None
+    if METRICS_PORT: serve_metrics(METRICS_PORT)
+    
+    async with mcp_server_context(mode="code", checkpoint=True) as agent:
+        # each stats://memory read resets the server's traced peak, so this one starts it for the first case
+        if profiler: await read_server_stats("stats://memory")
         for case in cases_to_run:
             print(f"\nRunning Q{case['id']}: {case['q']}")
             start = time.time()
+            if profiler: profiler.start_case()
             
             messages = [
                 SystemMessage(content=SYSTEM_PROMPT),
@@ -121,16 +129,20 @@ async def run_evaluation():
             
             # helps capture tokens used even if it fails
             current_history = []
+            budget = Budget(MAX_LLM_CALLS, MAX_TOKENS, MAX_SECONDS)
+            # checkpoint thread, inspect or resume with: python checkpoints.py show|resume <thread_id>
+            thread_id = f"code-{case['id']}-{int(start)}"
             
             async def consume_stream():
                 nonlocal current_history
-                async for chunk in agent.astream({"messages": messages}, stream_mode="values"):
-                    current_history = chunk["messages"]
+                with budget.active():
+                    async for chunk in agent.astream({"messages": messages}, run_config(budget, thread_id), stream_mode="values"):
+                        current_history = chunk["messages"]
                 return current_history
 
             try:
                 # success path for testing
-                history = await asyncio.wait_for(consume_stream(), timeout=300.0)
+                history = await asyncio.wait_for(consume_stream(), timeout=HARD_TIMEOUT)
                 duration = time.time() - start
                 
                 i_tok, o_tok, t_tok = calculate_tokens(history)
@@ -145,24 +157,42 @@ async def run_evaluation():
                     status = "PASS"
                 
                 print(f"   -> {status} (Time: {duration:.2f}s | Tokens: {t_tok})")
-                log_debug(logs, case, final_out, status, duration, i_tok, o_tok, t_tok)
+                entry = log_debug(answers, case, final_out, status, duration, i_tok, o_tok, t_tok, thread_id)
+            
+            except BudgetExceeded as e:
+                # budget path: the work so far is in the checkpoint, not thrown away
+                i_tok, o_tok, t_tok = calculate_tokens(current_history)
+                
+                print(f"   -> BUDGET: {e.reason} | Partial Tokens: {t_tok} | Thread: {thread_id}")
+                entry = log_debug(answers, case, e.reason, "BUDGET", time.time() - start, i_tok, o_tok, t_tok, thread_id)
             
             except asyncio.TimeoutError:
                 # timeout failure path for testing with token calculation
                 i_tok, o_tok, t_tok = calculate_tokens(current_history)
                 
-                print(f"   -> CRASH: Timeout (>300s) | Partial Tokens: {t_tok}")
-                log_debug(logs, case, "Timeout: Execution exceeded 300 seconds", "CRASH", 300.0, i_tok, o_tok, t_tok)
+                print(f"   -> CRASH: Timeout (>{HARD_TIMEOUT:.0f}s) | Partial Tokens: {t_tok}")
+                entry = log_debug(answers, case, f"Timeout: Execution exceeded {HARD_TIMEOUT:.0f} seconds", "CRASH", HARD_TIMEOUT, i_tok, o_tok, t_tok, thread_id)
                 
             except Exception as e:
                 # probably 0 tokens if it crashes for reasons other than timeout
                 print(f"   -> CRASH: {e}")
-                log_debug(logs, case, str(e), "CRASH", 0, 0, 0, 0)
+                entry = log_debug(answers, case, str(e), "CRASH", 0, 0, 0, 0, thread_id)
+
+            if profiler:
+                entry["memory"] = profiler.end_case(case['id'], await read_server_stats("stats://memory"))
+            answers.append(entry)
+
+        dump_metrics(metrics_file_for(ANSWERS_FILE, "_server"), await read_server_metrics())
+    dump_metrics(metrics_file_for(ANSWERS_FILE))
 
-    passed = len([l for l in logs if "PASS" in l["status"]])
+    passed = answers.statuses["PASS"]
+    budget_hits = answers.statuses["BUDGET"]
+    crashes = answers.statuses["CRASH"]
     print("\n" + "="*50)
-    print(f"Code Mode Evaluation Complete. Score: {passed}/{len(logs)}")
+    print(f"Code Mode Evaluation Complete. Score: {passed}/{answers.count} | Budget exhausted: {budget_hits} | Crashes: {crashes}")
+    if profiler: print(profiler.summary())
     print(f"Detailed logs saved to {ANSWERS_FILE}")
+    print(f"Metrics saved to {metrics_file_for(ANSWERS_FILE)} (server: {metrics_file_for(ANSWERS_FILE, '_server')})")
 
 if __name__ == "__main__":
     asyncio.run(run_evaluation())
\ No newline at end of file
@@ -1,14 +1,20 @@
 import asyncio
-import json
 import os
+import sys
 import time
 
 from langchain_core.messages import AIMessage, HumanMessage, SystemMessage
 
-from mcp_client import mcp_server_context
+from mcp_client import mcp_server_context, read_server_metrics, read_server_stats
+from memory_profile import MEMORY_PROFILE, MemoryProfiler
+from metrics import METRICS_PORT, dump_metrics, metrics_file_for, serve_metrics
+from tool_schema import SCHEMA_MODES
+from answers_log import AnswersLog
+from workload import DEFAULT_TEST_SET, iter_test_cases, test_set_suffix
 
 ANSWERS_FILE = "../test/answers_mcp_qwen.json"
 MODEL_NAME = "qwen2.5:14B"
+TEST_SET_FILE = os.environ.get("TEST_SET", DEFAULT_TEST_SET)
 
 SYSTEM_PROMPT = """You are an expert SCM Assistant. 
 You have access to specific tools to find Part IDs, check stock, and calculate shipping.
@@ -20,15 +26,19 @@ CRITICAL RULES:
 4. Do not describe what you are doing. Just execute the tool calls.
 """
 
-def load_test_cases():
-    with open('../test/test_set.json', 'r') as f: return json.load(f)
+def answers_file_for(schema_mode):
+    """Verbose on the committed test set keeps the original answers file; other schema modes and TEST_SETs get suffixes"""
+    suffix = "" if schema_mode == "verbose" else f"_{schema_mode}"
+    return ANSWERS_FILE.replace(".json", f"{suffix}{test_set_suffix(TEST_SET_FILE)}.json")
 
-def log_debug(logs, case, actual, status, duration, input_tokens, output_tokens, total_tokens):
-    previous_total_time = sum(item.get("duration_seconds", 0) for item in logs)
-    total_accumulated_time = previous_total_time + duration
+def load_test_cases():
+    """Streams cases so large generated test sets are not held in memory"""
+    return iter_test_cases(TEST_SET_FILE)
 
-    previous_total_tokens = sum(item.get("total_tokens", 0) for item in logs)
-    total_accumulated_tokens = previous_total_tokens + total_tokens
+def log_debug(answers, case, actual, status, duration, input_tokens, output_tokens, total_tokens):
+    """Answers entry with running totals; appended once the case's memory record (if any) is added"""
+    total_accumulated_time = answers.total_time + duration
+    total_accumulated_tokens = answers.total_tokens + total_tokens
 
     entry = {
         "id": case['id'], 
@@ -43,21 +53,26 @@ def log_debug(logs, case, actual, status, duration, input_tokens, output_tokens,
         "duration_seconds": round(duration, 2),
         "cumulative_time_seconds": round(total_accumulated_time, 2)
     }
-    
-    logs.append(entry)
-    with open(ANSWERS_FILE, 'w') as f: json.dump(logs, f, indent=2)
+    return entry
 
-async def run_evaluation():
-    if os.path.exists(ANSWERS_FILE): os.remove(ANSWERS_FILE)
+async def run_evaluation(schema_mode="verbose"):
+    answers_file = answers_file_for(schema_mode)
+    answers = AnswersLog(answers_file)
+    answers.clear()
     cases = load_test_cases()
-    logs = []
     
-    print(f"Evaluating {len(cases)} cases against MCP Agent ({MODEL_NAME})...")
+    print(f"Evaluating {TEST_SET_FILE} against MCP Agent ({MODEL_NAME}, {schema_mode} tool schemas)...")
     
-    async with mcp_server_context(mode="standard") as agent:
+    profiler = MemoryProfiler() if MEMORY_PROFILE else None
+    if METRICS_PORT: serve_metrics(METRICS_PORT)
+    
+    async with mcp_server_context(mode="standard", schema_mode=schema_mode) as agent:
+        # each stats://memory read resets the server's traced peak, so this one starts it for the first case
+        if profiler: await read_server_stats("stats://memory")
         for case in cases:
             print(f"\nRunning Q{case['id']}: {case['q']}")
             start = time.time()
+            if profiler: profiler.start_case()
             
             messages = [
                 SystemMessage(content=SYSTEM_PROMPT),
@@ -95,8 +110,8 @@ async def run_evaluation():
                 
                 print(f"   -> {status} (Time: {duration:.2f}s | Tokens: {calc_total_tokens})")
                 
-                log_debug(
-                    logs, 
+                entry = log_debug(
+                    answers, 
                     case, 
                     final_out, 
                     status, 
@@ -108,12 +123,24 @@ async def run_evaluation():
                 
             except Exception as e:
                 print(f"   -> CRASH: {e}")
-                log_debug(logs, case, str(e), "CRASH", 0, 0, 0, 0)
+                entry = log_debug(answers, case, str(e), "CRASH", 0, 0, 0, 0)
+
+            if profiler:
+                entry["memory"] = profiler.end_case(case['id'], await read_server_stats("stats://memory"))
+            answers.append(entry)
+
+        dump_metrics(metrics_file_for(answers_file, "_server"), await read_server_metrics())
+    dump_metrics(metrics_file_for(answers_file))
 
-    passed = len([l for l in logs if "PASS" in l["status"]])
     print("\n" + "="*50)
-    print(f"Evaluation Complete. Score: {passed}/{len(cases)}")
-    print(f"Detailed logs saved to {ANSWERS_FILE}")
+    print(f"Evaluation Complete. Score: {answers.statuses['PASS']}/{answers.count}")
+    if profiler: print(profiler.summary())
+    print(f"Detailed logs saved to {answers_file}")
+    print(f"Metrics saved to {metrics_file_for(answers_file)} (server: {metrics_file_for(answers_file, '_server')})")
 
 if __name__ == "__main__":
-    asyncio.run(run_evaluation())
\ No newline at end of file
+    schema_mode = sys.argv[1] if len(sys.argv) > 1 else "verbose"
+    if schema_mode not in SCHEMA_MODES:
+        print(f"Invalid schema mode. Usage: python evaluate_mcp.py [{'|'.join(SCHEMA_MODES)}]")
+        sys.exit(1)
+    asyncio.run(run_evaluation(schema_mode))
\ No newline at end of file
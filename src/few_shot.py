@@ -0,0 +1,159 @@
+import math
+import re
+from collections import Counter
+
+# Worker few-shot store. The first two examples per worker are the original static prompt blocks.
+FEW_SHOT_EXAMPLES = {
+    "inventory": [
+        {"title": "FEW-SHOT EXAMPLE", "question": "How many Windshields are in stock?", "text": """User: How many Windshields are in stock?
+    Worker:
+
+    Call: get_part_id("Windshield")
+    Result: ID-555
+
+    Call: get_stock_level("ID-555")
+    Result: 15
+
+    Final Answer: There are 15 Windshields in stock."""},
+        {"title": "FEW-SHOT EXAMPLE (MULTI-STEP)", "question": "How many Engines do we have?", "text": """User: How many Engines do we have?
+    Worker:
+
+    # Step 1: Find ID
+    Call: get_part_id("Engine")
+    Result: ID-999
+
+    # Step 2: Check Stock
+    Call: get_stock_level("ID-999")
+    Result: 4
+
+    Final Answer: We have 4 Engines in stock."""},
+        {"title": "FEW-SHOT EXAMPLE", "question": "What is the ID for the Tyre?", "text": """User: What is the ID for the Tyre?
+    Worker:
+
+    Call: get_part_id("Tyre")
+    Result: ID-100
+
+    Final Answer: The ID for the Tyre is ID-100."""},
+        {"title": "FEW-SHOT EXAMPLE", "question": "What is the stock level for ID-200?", "text": """User: What is the stock level for ID-200?
+    Worker:
+
+    Call: get_stock_level("ID-200")
+    Result: 50
+
+    Final Answer: The stock level for ID-200 is 50."""},
+        {"title": "FEW-SHOT EXAMPLE (MULTI-STEP)", "question": "What is the total inventory count for Tyres and Windshields?", "text": """User: What is the total inventory count for Tyres and Windshields?
+    Worker:
+
+    Call: get_part_id("Tyre")
+    Result: ID-100
+
+    Call: get_stock_level("ID-100")
+    Result: 200
+
+    Call: get_part_id("Windshield")
+    Result: ID-555
+
+    Call: get_stock_level("ID-555")
+    Result: 15
+
+    Final Answer: There are 200 Tyres and 15 Windshields, 215 in total."""},
+    ],
+    "logistics": [
+        {"title": "FEW-SHOT EXAMPLE", "question": "What is the cost to ship ID-200?", "text": """User: What is the cost to ship ID-200?
+    Worker:
+
+    Call: get_supplier_location("ID-200")
+    Result: Berlin
+
+    Call: get_shipping_cost("Berlin")
+    Result: 60 EUR
+
+    Final Answer: The shipping cost for ID-200 is 60 EUR."""},
+        {"title": "FEW-SHOT EXAMPLE (MULTI-STEP)", "question": "How much to ship for a Tire?", "text": """User: How much to ship for a Tire? (The Supervisor already found ID-100)
+    Worker:
+
+    Call: get_supplier_location("ID-100")
+    Result: Munich
+
+    Call: get_shipping_cost("Munich")
+    Result: 50 EUR
+
+    Final Answer: The shipping cost for the Tire supplier is 50 EUR."""},
+        {"title": "FEW-SHOT EXAMPLE", "question": "Where is the supplier for ID-555 located?", "text": """User: Where is the supplier for ID-555 located?
+    Worker:
+
+    Call: get_supplier_location("ID-555")
+    Result: Hamburg
+
+    Final Answer: The supplier for ID-555 is located in Hamburg."""},
+        {"title": "FEW-SHOT EXAMPLE", "question": "What does shipping from Stuttgart cost?", "text": """User: What does shipping from Stuttgart cost?
+    Worker:
+
+    Call: get_shipping_cost("Stuttgart")
+    Result: 150 EUR
+
+    Final Answer: Shipping from Stuttgart costs 150 EUR."""},
+    ],
+}
+
+STATIC_EXAMPLE_COUNT = 2
+DEFAULT_K = 2
+DEFAULT_TOKEN_BUDGET = 100
+
+def estimate_tokens(text: str) -> int:
+    """Offline token estimate (same heuristic as the benchmark.count_tokens fallback)"""
+    return int(len(text.split()) * 1.5)
+
+def _terms(text: str) -> list:
+    """Word unigrams plus character trigrams, so 'Tire'/'Tyre' and plurals still overlap"""
+    words = re.findall(r"[a-z0-9]+(?:-[0-9]+)?", text.lower())
+    grams = [w[i:i + 3] for w in words for i in range(max(1, len(w) - 2))]
+    return words + [f"#{g}" for g in grams]
+
+class FewShotRetriever:
+    """TF-IDF index over the example questions of one worker"""
+
+    def __init__(self, examples: list):
+        self.examples = examples
+        counts = [Counter(_terms(e["question"])) for e in examples]
+        doc_freq = Counter(term for c in counts for term in c)
+        n = len(examples)
+        self.idf = {term: math.log((1 + n) / (1 + df)) + 1 for term, df in doc_freq.items()}
+        self.vectors = [self._weigh(c) for c in counts]
+
+    def _weigh(self, counts: Counter) -> dict:
+        vec = {term: tf * self.idf.get(term, 0.0) for term, tf in counts.items()}
+        norm = math.sqrt(sum(v * v for v in vec.values())) or 1.0
+        return {term: v / norm for term, v in vec.items()}
+
+    def select(self, query: str, k: int = DEFAULT_K, token_budget: int = DEFAULT_TOKEN_BUDGET) -> list:
+        """Top-k examples by cosine similarity that fit within token_budget"""
+        q = self._weigh(Counter(_terms(query)))
+        scored = sorted(
+            range(len(self.examples)),
+            key=lambda i: sum(w * self.vectors[i].get(t, 0.0) for t, w in q.items()),
+            reverse=True
+        )
+
+        selected = []
+        used = 0
+        for i in scored:
+            if len(selected) >= k: break
+            cost = estimate_tokens(self.examples[i]["text"])
+            if used + cost > token_budget: continue
+            selected.append(self.examples[i])
+            used += cost
+        return selected
+
+_retrievers = {}
+
+def format_examples(examples: list) -> str:
+    return "\n\n".join(f"{e['title']}:\n    {e['text']}" for e in examples)
+
+def static_examples(worker: str) -> str:
+    return format_examples(FEW_SHOT_EXAMPLES[worker][:STATIC_EXAMPLE_COUNT])
+
+def dynamic_examples(worker: str, query: str, k: int = DEFAULT_K, token_budget: int = DEFAULT_TOKEN_BUDGET) -> str:
+    if worker not in _retrievers:
+        _retrievers[worker] = FewShotRetriever(FEW_SHOT_EXAMPLES[worker])
+    return format_examples(_retrievers[worker].select(query, k, token_budget))
@@ -0,0 +1,43 @@
+import time
+
+from langchain_core.callbacks import BaseCallbackHandler
+
+from metrics import LLM_CALLS, LLM_INFLIGHT, LLM_LATENCY, LLM_TOKENS
+
+class LLMMetrics(BaseCallbackHandler):
+    """Feeds LLM latency and token histograms per graph node and model (attach as a model callback)"""
+
+    def __init__(self):
+        self._started = {}
+
+    def on_chat_model_start(self, serialized, messages, *, run_id, metadata=None, **kwargs):
+        self.on_llm_start(serialized, [], run_id=run_id, metadata=metadata, **kwargs)
+
+    def on_llm_start(self, serialized, prompts, *, run_id, metadata=None, **kwargs):
+        metadata = metadata or {}
+        labels = {"node": metadata.get("langgraph_node", "none"), "model": metadata.get("ls_model_name", "unknown")}
+        self._started[run_id] = (time.perf_counter(), labels)
+        LLM_INFLIGHT.inc(model=labels["model"])
+
+    def _finish(self, run_id, outcome: str):
+        started, labels = self._started.pop(run_id, (None, None))
+        if started is None: return None
+        LLM_INFLIGHT.dec(model=labels["model"])
+        LLM_LATENCY.observe(time.perf_counter() - started, **labels)
+        LLM_CALLS.inc(outcome=outcome, **labels)
+        return labels
+
+    def on_llm_end(self, response, *, run_id, **kwargs):
+        labels = self._finish(run_id, "ok")
+        if labels is None: return
+        for generations in response.generations:
+            for generation in generations:
+                usage = getattr(getattr(generation, "message", None), "usage_metadata", None) or {}
+                LLM_TOKENS.observe(usage.get("input_tokens", 0), direction="input", **labels)
+                LLM_TOKENS.observe(usage.get("output_tokens", 0), direction="output", **labels)
+
+    def on_llm_error(self, error, *, run_id, **kwargs):
+        self._finish(run_id, "error")
+
+# One handler per process; passed as callbacks= to every ChatOllama
+LLM_METRICS = LLMMetrics()
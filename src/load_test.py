@@ -0,0 +1,170 @@
+import argparse
+import asyncio
+import json
+import math
+import random
+import time
+
+from langchain_core.messages import HumanMessage, SystemMessage
+
+from agent_graph import run_hierarchical_agent
+from evaluate_mcp import SYSTEM_PROMPT
+from mcp_client import mcp_server_context
+
+RESULTS_FILE = "../test/load_test_results.json"
+
+SLO_PERCENTILE = 95
+SLO_SECONDS = 30.0
+START_RATE = 0.02       # questions per second
+RATE_STEP = 0.02
+MAX_RATE = 1.0
+STEP_DURATION = 120.0   # seconds of arrivals per rate step
+MAX_CONCURRENCY = 4     # requests serviced at once, the rest wait in the queue
+
+def load_test_cases():
+    with open('../test/test_set.json', 'r') as f: return json.load(f)
+
+def percentile(values, p):
+    """Nearest-rank percentile, 0.0 for an empty list"""
+    if not values: return 0.0
+    ordered = sorted(values)
+    rank = max(0, min(len(ordered) - 1, math.ceil(p / 100 * len(ordered)) - 1))
+    return ordered[rank]
+
+async def run_step(target, cases, rate, duration, concurrency, rng):
+    """Open-loop step: Poisson arrivals at `rate` for `duration` seconds, independent of completions"""
+    slots = asyncio.Semaphore(concurrency)
+    records = []
+
+    async def handle(case, arrival):
+        async with slots:
+            started = time.time()
+            error = ""
+            answer = ""
+            try:
+                answer = await target(case["q"])
+            except Exception as e:
+                error = str(e)
+            finished = time.time()
+
+        records.append({
+            "id": case["id"],
+            "queue_delay": started - arrival,
+            "service_time": finished - started,
+            "latency": finished - arrival,
+            "passed": not error and case["expected"].lower() in answer.lower(),
+            "error": error
+        })
+
+    step_start = time.time()
+    tasks = []
+    next_arrival = step_start + rng.expovariate(rate)
+
+    while next_arrival < step_start + duration:
+        await asyncio.sleep(max(0.0, next_arrival - time.time()))
+        tasks.append(asyncio.create_task(handle(rng.choice(cases), next_arrival)))
+        next_arrival += rng.expovariate(rate)
+
+    # Drain everything that arrived during the window
+    await asyncio.gather(*tasks)
+    elapsed = time.time() - step_start
+
+    latencies = [r["latency"] for r in records]
+    errors = len([r for r in records if r["error"]])
+
+    return {
+        "rate": rate,
+        "arrivals": len(records),
+        "completed": len(records) - errors,
+        "throughput": (len(records) - errors) / elapsed if elapsed > 0 else 0.0,
+        "error_rate": errors / len(records) if records else 0.0,
+        "pass_rate": len([r for r in records if r["passed"]]) / len(records) if records else 0.0,
+        "p50_latency": percentile(latencies, 50),
+        f"p{SLO_PERCENTILE}_latency": percentile(latencies, SLO_PERCENTILE),
+        "mean_queue_delay": sum(r["queue_delay"] for r in records) / len(records) if records else 0.0,
+        "mean_service_time": sum(r["service_time"] for r in records) / len(records) if records else 0.0,
+        "requests": records
+    }
+
+async def ramp(target, cases, args):
+    """Increase arrival rate until the latency SLO breaks"""
+    rng = random.Random(args.seed)
+    steps = []
+    sustainable = None
+    rate = args.start_rate
+
+    while rate <= args.max_rate + 1e-9:
+        print(f"\nRate {rate:.3f} q/s for {args.step_duration:.0f}s...")
+        step = await run_step(target, cases, rate, args.step_duration, args.concurrency, rng)
+        steps.append(step)
+
+        p_slo = step[f"p{SLO_PERCENTILE}_latency"]
+        print(f"   -> arrivals {step['arrivals']} | throughput {step['throughput']:.3f} q/s | "
+              f"p{SLO_PERCENTILE} {p_slo:.2f}s | queue {step['mean_queue_delay']:.2f}s | "
+              f"service {step['mean_service_time']:.2f}s | errors {step['error_rate']:.0%}")
+
+        if step["arrivals"] and p_slo > args.slo:
+            print(f"   -> SLO broken (p{SLO_PERCENTILE} {p_slo:.2f}s > {args.slo:.2f}s)")
+            break
+        if step["arrivals"]:
+            sustainable = step
+        rate += args.rate_step
+
+    return steps, sustainable
+
+def make_hierarchical_target():
+    async def target(query):
+        answer, _ = await asyncio.to_thread(run_hierarchical_agent, query)
+        return str(answer)
+    return target
+
+def make_mcp_target(agent):
+    async def target(query):
+        messages = [SystemMessage(content=SYSTEM_PROMPT), HumanMessage(content=query)]
+        result = await agent.ainvoke({"messages": messages})
+        return str(result["messages"][-1].content)
+    return target
+
+async def run_load_test(args):
+    cases = load_test_cases()
+    print(f"Load test on {args.paradigm} | SLO p{SLO_PERCENTILE} < {args.slo}s | concurrency {args.concurrency}")
+
+    if args.paradigm == "hierarchical":
+        steps, sustainable = await ramp(make_hierarchical_target(), cases, args)
+    else:
+        mode = "code" if args.paradigm == "code" else "standard"
+        async with mcp_server_context(mode=mode) as agent:
+            steps, sustainable = await ramp(make_mcp_target(agent), cases, args)
+
+    report = {
+        "paradigm": args.paradigm,
+        "slo_seconds": args.slo,
+        "slo_percentile": SLO_PERCENTILE,
+        "concurrency": args.concurrency,
+        "max_sustainable_rate": sustainable["rate"] if sustainable else 0.0,
+        "max_sustainable_throughput": sustainable["throughput"] if sustainable else 0.0,
+        "steps": steps
+    }
+    with open(args.output, 'w') as f: json.dump(report, f, indent=2)
+
+    print("\n" + "="*50)
+    if sustainable:
+        print(f"Max sustainable rate: {sustainable['rate']:.3f} q/s "
+              f"(throughput {sustainable['throughput']:.3f} q/s, errors {sustainable['error_rate']:.0%})")
+    else:
+        print("SLO broken at the lowest rate tested.")
+    print(f"Detailed results saved to {args.output}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Open-loop load generator with latency SLO ramp")
+    parser.add_argument("--paradigm", choices=["hierarchical", "mcp", "code"], default="mcp")
+    parser.add_argument("--slo", type=float, default=SLO_SECONDS, help=f"p{SLO_PERCENTILE} latency limit in seconds")
+    parser.add_argument("--start-rate", type=float, default=START_RATE)
+    parser.add_argument("--rate-step", type=float, default=RATE_STEP)
+    parser.add_argument("--max-rate", type=float, default=MAX_RATE)
+    parser.add_argument("--step-duration", type=float, default=STEP_DURATION)
+    parser.add_argument("--concurrency", type=int, default=MAX_CONCURRENCY)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", default=RESULTS_FILE)
+
+    asyncio.run(run_load_test(parser.parse_args()))
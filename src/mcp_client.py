@@ -1,12 +1,15 @@
 import asyncio
-from contextlib import asynccontextmanager
+from contextlib import asynccontextmanager, contextmanager, nullcontext
+from contextvars import ContextVar
+from functools import lru_cache
+import hashlib
+import json
 import os
 import sys
 from typing import Annotated, Any, AsyncGenerator, Type, TypedDict
 
 from langchain_core.messages import BaseMessage, HumanMessage, SystemMessage
 from langchain_core.tools import StructuredTool
-from langchain_ollama import ChatOllama
 from langgraph.graph import END, START, StateGraph
 from langgraph.graph.message import add_messages
 from langgraph.prebuilt import ToolNode, tools_condition
@@ -14,9 +17,46 @@ from mcp import ClientSession, StdioServerParameters
 from mcp.client.stdio import stdio_client
 from pydantic import BaseModel, create_model, Field
 
+from budget import async_checkpointer, with_budget
+from code_executor import LOCAL_CODE_TOOL_DESCRIPTION, execute_local
+from llm_metrics import LLM_METRICS
+from metrics import Counter, Gauge, Histogram
+from single_flight import SingleFlight
+from tool_schema import compact_description, compact_input_schema
+from tools import lookup_key
+
 MODEL_NAME = "qwen2.5:14B"
 SERVER_SCRIPT = "mcp_server.py"
 
+# stdio spawns a private server per context; sse connects to a shared one (python mcp_server.py --transport sse)
+DEFAULT_TRANSPORT = os.environ.get("MCP_TRANSPORT", "stdio")
+SERVER_URL = os.environ.get("MCP_SERVER_URL", "http://127.0.0.1:8000/sse")
+
+# Where execute_python_code runs: "mcp" sends the script to the server, "local" runs it in a local worker process
+# with the tools.py lookups bound directly (see code_executor.py); other tools, reservations included, always go over MCP
+CODE_EXECUTOR = os.environ.get("CODE_EXECUTOR", "mcp")
+
+# Sessions currently open per url ({"session", "users", "idle"}); other contexts, nested or concurrent, reuse them
+_shared_sessions = {}
+
+# list_tools() results persisted across runs, keyed by a hash of the server sources
+MANIFEST_CACHE = ".mcp_tool_manifest.json"
+SERVER_SOURCES = [SERVER_SCRIPT, "tools.py", "code_executor.py"]
+
+# Compiled agents per (mode, schema_mode, manifest key, checkpoint, code executor); tool wrappers look up the live session here
+_agent_cache = {}
+_current_session = ContextVar("mcp_session")
+_checkpointer = None
+
+# Identical read-only calls in flight on the same session go over the wire once
+CLIENT_FLIGHT = SingleFlight()
+
+MCP_ROUNDTRIP = Histogram("scm_mcp_roundtrip_seconds", "Client-side call_tool round trip (coalesced calls included)", ("tool",))
+MCP_INFLIGHT = Gauge("scm_mcp_inflight", "call_tool requests awaiting a reply", ("tool",))
+CACHE_LOOKUPS = Counter("scm_client_cache_total", "Tool manifest and compiled agent cache lookups", ("cache", "result"))
+CLIENT_COALESCING = Gauge("scm_client_singleflight", "Client single-flight counters", ("stat",))
+for _stat in CLIENT_FLIGHT.stats: CLIENT_COALESCING.track(lambda s=_stat: CLIENT_FLIGHT.stats[s], stat=_stat)
+
 def jsonschema_to_pydantic(name: str, schema: dict) -> Type[BaseModel]:
     """MCP json schema to Pydantic"""
     fields = {}
@@ -42,12 +82,75 @@ def jsonschema_to_pydantic(name: str, schema: dict) -> Type[BaseModel]:
 
     return create_model(name, **fields)
 
+@lru_cache(maxsize=None)
+def cached_schema_model(name: str, schema_json: str) -> Type[BaseModel]:
+    """jsonschema_to_pydantic memoized on the serialized schema"""
+    return jsonschema_to_pydantic(name, json.loads(schema_json))
+
+def server_version_hash() -> str:
+    digest = hashlib.sha256()
+    for path in SERVER_SOURCES:
+        with open(path, 'rb') as f: digest.update(f.read())
+    return digest.hexdigest()[:16]
+
+async def load_tool_manifest(session: ClientSession, cache_key: str) -> list:
+    """Tool name/description/inputSchema list, from MANIFEST_CACHE when the key matches"""
+    cache = {}
+    if os.path.exists(MANIFEST_CACHE):
+        try:
+            with open(MANIFEST_CACHE, 'r') as f: cache = json.load(f)
+        except (json.JSONDecodeError, OSError):
+            cache = {}
+    if cache_key in cache:
+        CACHE_LOOKUPS.inc(cache="manifest", result="hit")
+        return cache[cache_key]
+    CACHE_LOOKUPS.inc(cache="manifest", result="miss")
+
+    mcp_tools = await session.list_tools()
+    manifest = [{"name": t.name, "description": t.description, "inputSchema": t.inputSchema} for t in mcp_tools.tools]
+    cache[cache_key] = manifest
+    with open(MANIFEST_CACHE, 'w') as f: json.dump(cache, f, indent=2)
+    return manifest
+
 class AgentState(TypedDict):
     messages: Annotated[list[BaseMessage], add_messages]
 
 @asynccontextmanager
-async def mcp_server_context(mode: str = "standard") -> AsyncGenerator:
-    """Connect to server, wrap and add tools"""
+async def open_session(transport: str = None, url: str = None) -> AsyncGenerator:
+    """Initialized ClientSession over stdio (private subprocess) or sse (shared server).
+    An sse connection is closed by the context that opened it, which waits on exit until its other users are done."""
+    transport = transport or DEFAULT_TRANSPORT
+    url = url or SERVER_URL
+
+    if transport == "sse":
+        from mcp.client.sse import sse_client
+
+        shared = _shared_sessions.get(url)
+        if shared is not None:
+            shared["users"] += 1
+            try:
+                yield shared["session"]
+            finally:
+                shared["users"] -= 1
+                if shared["users"] == 0: shared["idle"].set()
+            return
+
+        async with sse_client(url) as (read, write):
+            async with ClientSession(read, write) as session:
+                await session.initialize()
+                shared = {"session": session, "users": 1, "idle": asyncio.Event()}
+                _shared_sessions[url] = shared
+                try:
+                    yield session
+                finally:
+                    # the connection's tasks belong to this context: stop handing it out, then wait for the others
+                    if _shared_sessions.get(url) is shared: del _shared_sessions[url]
+                    shared["users"] -= 1
+                    if shared["users"]: await shared["idle"].wait()
+        return
+
+    if transport != "stdio":
+        raise ValueError(f"Unknown transport: {transport} (expected stdio or sse)")
     if not os.path.exists(SERVER_SCRIPT):
         raise FileNotFoundError(f"Server script not found: {SERVER_SCRIPT}")
 
@@ -60,58 +163,138 @@ async def mcp_server_context(mode: str = "standard") -> AsyncGenerator:
         env=env
     )
 
-    print(f"Connecting to MCP Server ({SERVER_SCRIPT}) in {mode.upper()} mode...")
+    async with stdio_client(server_params) as (read, write):
+        async with ClientSession(read, write) as session:
+            await session.initialize()
+            yield session
+
+def manifest_tool_specs(manifest: list, mode: str, schema_mode: str) -> list:
+    """Name, description and args schema of each manifest tool the agent binds in this mode and schema mode"""
+    specs = []
+    for tool in manifest:
+        if mode == "standard" and tool["name"] == "execute_python_code":
+            continue
+        input_schema = compact_input_schema(tool["inputSchema"], schema_mode)
+        specs.append({
+            "name": tool["name"],
+            "description": compact_description(tool["description"], schema_mode),
+            "args_schema": cached_schema_model(f"{tool['name']}Schema", json.dumps(input_schema, sort_keys=True))
+        })
+    return specs
+
+def build_agent(manifest: list, mode: str, schema_mode: str, checkpointer=None, code_executor: str = "mcp"):
+    """Wraps the manifest tools and compiles the agent graph; returns (agent, tool count)"""
+    from langchain_ollama import ChatOllama
+
+    langchain_tools = []
+
+    for spec in manifest_tool_specs(manifest, mode, schema_mode):
+        if spec["name"] == "execute_python_code" and code_executor == "local":
+            spec["description"] = compact_description(LOCAL_CODE_TOOL_DESCRIPTION, schema_mode)
+
+        def create_tool_wrapper(tool_name):
+            if tool_name == "execute_python_code" and code_executor == "local":
+                async def run_local(code: str):
+                    # the reservations live on the server; scripts must see them in stock levels
+                    reserved = await read_server_stats("stats://reservations")
+                    return await asyncio.to_thread(execute_local, code, reserved)
+                return run_local
+
+            async def wrapper(**kwargs):
+                session = _current_session.get()
+                key = lookup_key(tool_name, kwargs)
+                with MCP_INFLIGHT.in_flight(tool=tool_name), MCP_ROUNDTRIP.time(tool=tool_name):
+                    if key is None:
+                        return await session.call_tool(tool_name, arguments=kwargs)
+                    return await CLIENT_FLIGHT.do((id(session),) + key, lambda: session.call_tool(tool_name, arguments=kwargs))
+            return wrapper
+
+        langchain_tools.append(StructuredTool.from_function(
+            func=None,
+            coroutine=create_tool_wrapper(spec["name"]),
+            **spec
+        ))
+
+    llm = ChatOllama(model=MODEL_NAME, temperature=0, num_ctx=4096, callbacks=[LLM_METRICS])
+    llm_with_tools = llm.bind_tools(langchain_tools)
+
+    def agent_node(state: AgentState):
+        return {"messages": [llm_with_tools.invoke(state["messages"])]}
+
+    workflow = StateGraph(AgentState)
+    workflow.add_node("agent", with_budget(agent_node))
+    workflow.add_node("tools", ToolNode(langchain_tools))
     
-    try:
-        async with stdio_client(server_params) as (read, write):
-            async with ClientSession(read, write) as session:
-                await session.initialize()
-                
-                mcp_tools = await session.list_tools()
-                langchain_tools = []
-
-                for tool in mcp_tools.tools:
-                    if mode == "standard" and tool.name == "execute_python_code":
-                        continue
-                        
-                    def create_tool_wrapper(tool_name):
-                        async def wrapper(**kwargs):
-                            return await session.call_tool(tool_name, arguments=kwargs)
-                        return wrapper
-
-                    args_schema = jsonschema_to_pydantic(f"{tool.name}Schema", tool.inputSchema)
-
-                    langchain_tools.append(StructuredTool.from_function(
-                        func=None,
-                        coroutine=create_tool_wrapper(tool.name),
-                        name=tool.name,
-                        description=tool.description,
-                        args_schema=args_schema
-                    ))
-                
-                print(f"Loaded {len(langchain_tools)} tools.")
+    workflow.add_edge(START, "agent")
+    workflow.add_conditional_edges("agent", tools_condition)
+    workflow.add_edge("tools", "agent")
 
-                llm = ChatOllama(model=MODEL_NAME, temperature=0, num_ctx=4096)
-                llm_with_tools = llm.bind_tools(langchain_tools)
+    return workflow.compile(checkpointer=checkpointer), len(langchain_tools)
 
-                def agent_node(state: AgentState):
-                    return {"messages": [llm_with_tools.invoke(state["messages"])]}
+@asynccontextmanager
+async def mcp_server_context(mode: str = "standard", schema_mode: str = "verbose", transport: str = None, url: str = None,
+                             checkpoint: bool = False, code_executor: str = None, session: ClientSession = None) -> AsyncGenerator:
+    """Connect to server, wrap and add tools (schema_mode: verbose, compact or minimal descriptions).
+    With checkpoint=True the agent persists every step and runs need a thread_id (see budget.run_config).
+    code_executor ("mcp" or "local") picks where execute_python_code scripts run.
+    An open session (from open_session, same transport and url) is used instead of connecting, so several agents share one server."""
+    global _checkpointer
+    transport = transport or DEFAULT_TRANSPORT
+    code_executor = code_executor or CODE_EXECUTOR
+    if code_executor not in ("mcp", "local"):
+        raise ValueError(f"Unknown code executor: {code_executor} (expected mcp or local)")
+    target = (url or SERVER_URL) if transport == "sse" else SERVER_SCRIPT
+    executor_note = ", scripts run in a local worker process" if mode == "code" and code_executor == "local" else ""
+    print(f"Connecting to MCP Server ({target}, {transport}) in {mode.upper()} mode ({schema_mode} tool schemas{executor_note})...")
+    
+    try:
+        async with nullcontext(session) if session else open_session(transport, url) as session:
+            source = f"sse:{url or SERVER_URL}" if transport == "sse" else "stdio"
+            cache_key = f"{source}:{server_version_hash()}"
+            agent_key = (mode, schema_mode, cache_key, checkpoint, code_executor)
 
-                workflow = StateGraph(AgentState)
-                workflow.add_node("agent", agent_node)
-                workflow.add_node("tools", ToolNode(langchain_tools))
-                
-                workflow.add_edge(START, "agent")
-                workflow.add_conditional_edges("agent", tools_condition)
-                workflow.add_edge("tools", "agent")
+            CACHE_LOOKUPS.inc(cache="agent", result="hit" if agent_key in _agent_cache else "miss")
+            if agent_key not in _agent_cache:
+                if checkpoint and _checkpointer is None:
+                    _checkpointer = await async_checkpointer()
+                manifest = await load_tool_manifest(session, cache_key)
+                _agent_cache[agent_key] = build_agent(manifest, mode, schema_mode, _checkpointer if checkpoint else None, code_executor)
+            agent, tool_count = _agent_cache[agent_key]
+            print(f"Loaded {tool_count} tools.")
 
-                agent = workflow.compile()
+            token = _current_session.set(session)
+            try:
                 yield agent
+            finally:
+                _current_session.reset(token)
 
     except Exception as e:
         print(f"\nError: {e}")
         raise
 
+def current_session() -> ClientSession:
+    """Session of the enclosing mcp_server_context (to hand to tasks that don't inherit its context)"""
+    return _current_session.get()
+
+@contextmanager
+def use_session(session: ClientSession):
+    """Binds a session for tool calls made by a cached agent outside the context that opened it"""
+    token = _current_session.set(session)
+    try:
+        yield session
+    finally:
+        _current_session.reset(token)
+
+async def read_server_stats(uri: str) -> dict:
+    """Reads a stats:// resource from the server of the current mcp_server_context"""
+    result = await _current_session.get().read_resource(uri)
+    return json.loads(result.contents[0].text)
+
+async def read_server_metrics() -> str:
+    """Prometheus text of the server of the current mcp_server_context"""
+    result = await _current_session.get().read_resource("stats://metrics")
+    return result.contents[0].text
+
 async def run_interactive(mode="standard"):
     """Interactive test mode without a system prompt"""   
     async with mcp_server_context(mode=mode) as agent:
@@ -1,12 +1,16 @@
-import contextlib
-import io
+import asyncio
+import json
 import logging
 import os
 import sys
-import traceback
+from concurrent.futures import ThreadPoolExecutor
 
 from mcp.server.fastmcp import FastMCP
 
+from memory_profile import MEMORY_PROFILE, process_memory
+from metrics import Gauge, render, serve_metrics
+from single_flight import SingleFlight
+
 sys.stdout.reconfigure(line_buffering=True)
 sys.stderr.reconfigure(line_buffering=True)
 
@@ -17,16 +21,62 @@ sys.path.append(os.getcwd())
 
 try:
     from tools import get_part_id, get_stock_level, get_supplier_location, get_shipping_cost
+    from tools import reserve_stock, release_stock, transfer_reservation
+    from tools import lookup_key, STOCK_STORE
+    from code_executor import CODE_TOOL_DESCRIPTION, run_script, stdout_proxy
 except ImportError as e:
     logger.error(f"Failed to import tools: {e}")
     sys.exit(1)
 
+# Tool bodies run on this pool so overlapping requests don't block the event loop or each other
+TOOL_WORKERS = int(os.environ.get("MCP_TOOL_WORKERS", "8"))
+executor = ThreadPoolExecutor(max_workers=TOOL_WORKERS, thread_name_prefix="scm-tool")
+
+# Installed once instead of redirect_stdout, which swaps the process-global stream per call
+stdout_proxy()
+
+POOL_INFLIGHT = Gauge("scm_server_pool_inflight", "Tool requests queued on or running in the tool pool")
+POOL_WORKERS = Gauge("scm_server_pool_workers", "Size of the tool pool")
+POOL_WORKERS.set(TOOL_WORKERS)
+
+async def run_blocking(func, *args):
+    with POOL_INFLIGHT.in_flight():
+        return await asyncio.get_running_loop().run_in_executor(executor, func, *args)
+
+# Identical lookups in flight at the same time share one backend execution
+flight = SingleFlight()
+SERVER_COALESCING = Gauge("scm_server_singleflight", "Server single-flight counters", ("stat",))
+for _stat in flight.stats: SERVER_COALESCING.track(lambda s=_stat: flight.stats[s], stat=_stat)
+
+async def run_lookup(tool_name: str, arguments: dict, func, *args):
+    return await flight.do(lookup_key(tool_name, arguments), lambda: run_blocking(func, *args))
+
 mcp = FastMCP("SCM_Logistics_Server")
 
+@mcp.resource("stats://coalescing")
+def coalescing_stats() -> str:
+    """Server-side single-flight counters"""
+    return json.dumps(flight.stats)
+
+@mcp.resource("stats://metrics")
+def metrics_text() -> str:
+    """Server metrics in the Prometheus text format"""
+    return render()
+
+@mcp.resource("stats://reservations")
+def reservations() -> str:
+    """Current stock reservations as {part_id: {order_id: quantity}} (loaded by the client's local code executor)"""
+    return json.dumps(STOCK_STORE.snapshot())
+
+@mcp.resource("stats://memory")
+def memory_stats() -> str:
+    """Server process RSS (and traced Python memory when MEMORY_PROFILE=1, with the peak since the previous read)"""
+    return json.dumps(process_memory(reset_peak=True))
+
 # inventory tools
 
 @mcp.tool()
-def find_part_id(part_name: str) -> str:
+async def find_part_id(part_name: str) -> str:
     """
     Retrieves the technical Part ID for a given English part name (e.g., "ID-999" or an error message).
     USE THIS FIRST. You cannot check stock or location without an ID.
@@ -34,90 +84,108 @@ def find_part_id(part_name: str) -> str:
     Args:
         part_name: The common name of the part (e.g., "Engine", "Tire").
     """
-    return get_part_id(part_name)
+    return await run_lookup("find_part_id", {"part_name": part_name}, get_part_id, part_name)
 
 @mcp.tool()
-def check_stock(part_id: str) -> str:
+async def check_stock(part_id: str) -> str:
     """
     Checks the current inventory quantity for a specific Part ID.
+    If units are reserved for orders, also reports how many are still available.
     
     Args:
         part_id: The technical ID (must start with "ID-", e.g., "ID-100").
     """
-    return get_stock_level(part_id)
+    return await run_lookup("check_stock", {"part_id": part_id}, get_stock_level, part_id)
 
-# logistics tools
+# reservation tools
 
 @mcp.tool()
-def find_supplier_city(part_id: str) -> str:
+async def reserve_parts(part_id: str, quantity: int, order_id: str) -> str:
     """
-    Finds the city where the supplier for a specific Part ID is located.
+    Reserves units of a Part ID for an order so other orders cannot take them.
     
     Args:
         part_id: The technical ID (must start with "ID-", e.g., "ID-100").
+        quantity: Number of units to reserve.
+        order_id: The order the units are reserved for.
     """
-    return get_supplier_location(part_id)
+    return await run_blocking(reserve_stock, part_id, quantity, order_id)
 
 @mcp.tool()
-def calculate_shipping(city: str) -> str:
+async def release_parts(part_id: str, quantity: int, order_id: str) -> str:
     """
-    Calculates the shipping cost to transport items from a specific Supplier City.
+    Releases units previously reserved for an order back into available stock.
     
     Args:
-        city: The name of the city (e.g., "Stuttgart", "Berlin").
+        part_id: The technical ID (must start with "ID-", e.g., "ID-100").
+        quantity: Number of units to release.
+        order_id: The order that holds the reservation.
     """
-    return get_shipping_cost(city)
-
-# code tool
+    return await run_blocking(release_stock, part_id, quantity, order_id)
 
 @mcp.tool()
-def execute_python_code(code: str) -> str:
+async def transfer_parts(part_id: str, quantity: int, from_order_id: str, to_order_id: str) -> str:
     """
-    Executes a Python script to answer complex SCM questions.
+    Moves reserved units of a Part ID from one order to another.
     
-    AVAILABLE FUNCTIONS (Already imported):
-    - get_part_id(part_name: str) -> str
-    - get_stock_level(part_id: str) -> str
-    - get_supplier_location(part_id: str) -> str
-    - get_shipping_cost(city: str) -> str
+    Args:
+        part_id: The technical ID (must start with "ID-", e.g., "ID-100").
+        quantity: Number of reserved units to move.
+        from_order_id: The order currently holding the reservation.
+        to_order_id: The order receiving the reservation.
+    """
+    return await run_blocking(transfer_reservation, part_id, quantity, from_order_id, to_order_id)
+
+# logistics tools
+
+@mcp.tool()
+async def find_supplier_city(part_id: str) -> str:
+    """
+    Finds the city where the supplier for a specific Part ID is located.
     
-    USAGE:
-    - Write a script that calls these functions to solve the problem.
-    - You MUST use print() to output the final answer or intermediate results.
-    - Do not import these functions; they are pre-loaded.
+    Args:
+        part_id: The technical ID (must start with "ID-", e.g., "ID-100").
+    """
+    return await run_lookup("find_supplier_city", {"part_id": part_id}, get_supplier_location, part_id)
+
+@mcp.tool()
+async def calculate_shipping(city: str) -> str:
+    """
+    Calculates the shipping cost to transport items from a specific Supplier City.
     
-    Example:
-      pid = get_part_id("Engine")
-      loc = get_supplier_location(pid)
-      print(f"Location is {loc}")
+    Args:
+        city: The name of the city (e.g., "Stuttgart", "Berlin").
     """
+    return await run_lookup("calculate_shipping", {"city": city}, get_shipping_cost, city)
+
+# code tool
+
+@mcp.tool(description=CODE_TOOL_DESCRIPTION)
+async def execute_python_code(code: str) -> str:
     logger.info("Executing Code Mode script...")
-    
-    sandbox_globals = {
-        "get_part_id": get_part_id,
-        "find_part_id": get_part_id, 
-        "get_stock_level": get_stock_level,
-        "check_stock": get_stock_level,
-        "get_supplier_location": get_supplier_location,
-        "find_supplier_city": get_supplier_location,
-        "get_shipping_cost": get_shipping_cost,
-        "calculate_shipping": get_shipping_cost,
-        "print": print
-    }
-    
-    output_capture = io.StringIO()
-    
-    try:
-        with contextlib.redirect_stdout(output_capture):
-            exec(code, sandbox_globals)
-        
-        result = output_capture.getvalue()
-        if not result.strip():
-            return "Code executed successfully but printed no output. Did you forget print()?"
-        return result
-        
-    except Exception as e:
-        return f"RUNTIME ERROR:\n{traceback.format_exc()}"
+    return await run_blocking(run_script, code)
 
 if __name__ == "__main__":
-    mcp.run()
\ No newline at end of file
+    import argparse
+
+    if MEMORY_PROFILE:
+        import tracemalloc
+        tracemalloc.start()
+
+    parser = argparse.ArgumentParser(description="SCM MCP server")
+    parser.add_argument("--transport", choices=["stdio", "sse"], default="stdio",
+                        help="stdio for a private subprocess, sse for a shared long-lived server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--metrics-port", type=int, default=None, help="also serve Prometheus /metrics on this port")
+    args = parser.parse_args()
+
+    if args.metrics_port:
+        serve_metrics(args.metrics_port, args.host)
+        logger.info(f"Metrics on http://{args.host}:{args.metrics_port}/metrics")
+
+    if args.transport == "sse":
+        mcp.settings.host = args.host
+        mcp.settings.port = args.port
+        logger.info(f"Serving on http://{args.host}:{args.port}/sse")
+    mcp.run(transport=args.transport)
\ No newline at end of file
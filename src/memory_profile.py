@@ -0,0 +1,112 @@
+import gc
+import os
+import resource
+import sys
+import tracemalloc
+
+# MEMORY_PROFILE=1 makes the evaluate scripts record per-case memory next to each answer
+MEMORY_PROFILE = os.environ.get("MEMORY_PROFILE") == "1"
+TOP_ALLOCATORS = 5
+# Memory still held after a case (post gc) growing by more than this marks the case as growing
+GROWTH_THRESHOLD_KB = 256
+# Slow leaks: a least-squares slope of retained memory (client) or RSS (server) across cases above this,
+# with total growth since the first case above GROWTH_THRESHOLD_KB, is reported as a leak
+LEAK_SLOPE_KB_PER_CASE = 16
+MIN_CASES_FOR_TREND = 5
+
+def process_memory(reset_peak: bool = False) -> dict:
+    """Current RSS and process-lifetime peak RSS (ru_maxrss never goes down) of this process in KB.
+    With tracing on, also traced memory and its peak since the last reset; reset_peak starts a new peak after reading."""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    if sys.platform == "darwin": peak //= 1024  # bytes on macOS, KB on Linux
+    current = None
+    try:
+        with open("/proc/self/statm", 'r') as f:
+            current = int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") // 1024
+    except (OSError, ValueError):
+        pass
+    memory = {"rss_kb": current, "lifetime_peak_rss_kb": peak}
+    if tracemalloc.is_tracing():
+        traced, traced_peak = tracemalloc.get_traced_memory()
+        memory.update({"traced_kb": traced // 1024, "traced_peak_kb": traced_peak // 1024})
+        if reset_peak: tracemalloc.reset_peak()
+    return memory
+
+def slope(values: list) -> float:
+    """Least-squares slope of values against their index"""
+    n = len(values)
+    if n < 2: return 0.0
+    mean_x = (n - 1) / 2
+    mean_y = sum(values) / n
+    covariance = sum((i - mean_x) * (v - mean_y) for i, v in enumerate(values))
+    variance = sum((i - mean_x) ** 2 for i in range(n))
+    return covariance / variance
+
+class MemoryProfiler:
+    """tracemalloc snapshots around each case plus process RSS"""
+
+    def __init__(self):
+        if not tracemalloc.is_tracing(): tracemalloc.start()
+        self.before = None
+        self.retained_before = 0
+        self.growing = []
+        # Per-case series for trend detection (server RSS only when the case reported it)
+        self.client_retained = []
+        self.server_rss = []
+
+    def start_case(self):
+        gc.collect()
+        tracemalloc.reset_peak()
+        self.before = tracemalloc.take_snapshot()
+        self.retained_before = tracemalloc.get_traced_memory()[0]
+
+    def end_case(self, case_id, server: dict = None) -> dict:
+        gc.collect()
+        after = tracemalloc.take_snapshot()
+        retained, peak = tracemalloc.get_traced_memory()
+        top = after.compare_to(self.before, "lineno")[:TOP_ALLOCATORS]
+
+        retained_kb = retained // 1024
+        growth_kb = (retained - self.retained_before) // 1024
+        server_rss = (server or {}).get("rss_kb")
+        server_growth_kb = server_rss - self.server_rss[-1] if server_rss is not None and self.server_rss else 0
+        growing = growth_kb > GROWTH_THRESHOLD_KB or server_growth_kb > GROWTH_THRESHOLD_KB
+        if growing: self.growing.append(case_id)
+
+        self.client_retained.append(retained_kb)
+        if server_rss is not None: self.server_rss.append(server_rss)
+
+        return {
+            "client": process_memory(),
+            "server": server,
+            "case_traced_peak_kb": peak // 1024,
+            # the server resets its traced peak on every stats://memory read, i.e. once per case
+            "server_case_traced_peak_kb": (server or {}).get("traced_peak_kb"),
+            "retained_kb": retained_kb,
+            "retained_growth_kb": growth_kb,
+            "retained_since_first_kb": retained_kb - self.client_retained[0],
+            "server_rss_growth_kb": server_growth_kb,
+            "growing": growing,
+            "top_allocators": [
+                {"where": str(stat.traceback[0]), "size_diff_kb": round(stat.size_diff / 1024, 1), "count_diff": stat.count_diff}
+                for stat in top
+            ]
+        }
+
+    def trends(self) -> dict:
+        """Slope (KB per case) and total growth since the first case of client retained memory and server RSS"""
+        return {
+            name: {"slope_kb_per_case": round(slope(series), 1), "growth_since_first_kb": series[-1] - series[0]}
+            for name, series in [("client_retained", self.client_retained), ("server_rss", self.server_rss)]
+            if len(series) >= MIN_CASES_FOR_TREND
+        }
+
+    def summary(self) -> str:
+        lines = []
+        if self.growing:
+            lines.append(f"Memory: retained memory grew by >{GROWTH_THRESHOLD_KB} KB after cases {self.growing} (possible leak)")
+        for name, trend in self.trends().items():
+            if trend["slope_kb_per_case"] > LEAK_SLOPE_KB_PER_CASE and trend["growth_since_first_kb"] > GROWTH_THRESHOLD_KB:
+                lines.append(f"Memory: {name} grows steadily, {trend['slope_kb_per_case']} KB per case, "
+                             f"{trend['growth_since_first_kb']} KB since the first case (possible leak)")
+        return "\n".join(lines) or "Memory: no case or trend grew retained memory beyond the thresholds."
@@ -0,0 +1,187 @@
+from contextlib import contextmanager
+import functools
+import os
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# METRICS_PORT=9100 makes the evaluate scripts serve /metrics while they run
+METRICS_PORT = int(os.environ["METRICS_PORT"]) if os.environ.get("METRICS_PORT") else None
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120)
+TOKEN_BUCKETS = (16, 64, 256, 512, 1024, 2048, 4096, 8192, 16384)
+INF_BUCKET = 'le="+Inf"'
+
+# Every metric created in this process, rendered in creation order
+_metrics = []
+_lock = threading.Lock()
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+def _labels(names, key, extra: str = "") -> str:
+    pairs = [f'{n}="{_escape(v)}"' for n, v in zip(names, key)]
+    if extra: pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+def _number(value) -> str:
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+class Metric:
+    """One metric family in the Prometheus text format; label values are passed as keyword arguments"""
+    kind = None
+
+    def __init__(self, name: str, help: str, labels: tuple = ()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labels)
+        self._values = {}
+        with _lock: _metrics.append(self)
+
+    def _key(self, labels: dict) -> tuple:
+        return tuple(str(labels.get(n, "")) for n in self.labelnames)
+
+    def samples(self) -> list:
+        with _lock: values = dict(self._values)
+        return [(self.name + _labels(self.labelnames, key), value) for key, value in sorted(values.items())]
+
+    def render(self) -> str:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+        lines += [f"{name} {_number(value)}" for name, value in self.samples()]
+        return "\n".join(lines)
+
+class Counter(Metric):
+    kind = "counter"
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        with _lock: self._values[key] = self._values.get(key, 0) + amount
+
+class Gauge(Metric):
+    kind = "gauge"
+
+    def __init__(self, name: str, help: str, labels: tuple = ()):
+        super().__init__(name, help, labels)
+        self._functions = {}
+
+    def set(self, value: float, **labels):
+        with _lock: self._values[self._key(labels)] = value
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        with _lock: self._values[key] = self._values.get(key, 0) + amount
+
+    def dec(self, amount: float = 1, **labels):
+        self.inc(-amount, **labels)
+
+    def track(self, func, **labels):
+        """Samples func() at render time (for counters kept elsewhere, e.g. SingleFlight.stats)"""
+        self._functions[self._key(labels)] = func
+
+    @contextmanager
+    def in_flight(self, **labels):
+        self.inc(**labels)
+        try:
+            yield
+        finally:
+            self.dec(**labels)
+
+    def samples(self) -> list:
+        with _lock: values = dict(self._values)
+        values.update({key: func() for key, func in self._functions.items()})
+        return [(self.name + _labels(self.labelnames, key), value) for key, value in sorted(values.items())]
+
+class Histogram(Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, help: str, labels: tuple = (), buckets: tuple = LATENCY_BUCKETS):
+        super().__init__(name, help, labels)
+        self.buckets = tuple(buckets)
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        with _lock:
+            counts, total, count = self._values.get(key, ([0] * len(self.buckets), 0.0, 0))
+            for i, bound in enumerate(self.buckets):
+                if value <= bound: counts[i] += 1
+            self._values[key] = (counts, total + value, count + 1)
+
+    @contextmanager
+    def time(self, **labels):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def render(self) -> str:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+        with _lock: values = {key: (list(c), s, n) for key, (c, s, n) in self._values.items()}
+        for key, (counts, total, count) in sorted(values.items()):
+            for bound, bucket_count in zip(self.buckets, counts):
+                le = 'le="%s"' % _number(bound)
+                lines.append(f"{self.name}_bucket{_labels(self.labelnames, key, le)} {bucket_count}")
+            lines.append(f"{self.name}_bucket{_labels(self.labelnames, key, INF_BUCKET)} {count}")
+            lines.append(f"{self.name}_sum{_labels(self.labelnames, key)} {_number(total)}")
+            lines.append(f"{self.name}_count{_labels(self.labelnames, key)} {count}")
+        return "\n".join(lines)
+
+def render() -> str:
+    """All metrics of this process in the Prometheus text exposition format"""
+    with _lock: metrics = list(_metrics)
+    return "\n".join(m.render() for m in metrics) + "\n"
+
+def dump_metrics(path: str, text: str = None):
+    """Writes the current metrics (or an already rendered text, e.g. from the server) for batch runs"""
+    with open(path, 'w') as f: f.write(text if text is not None else render())
+
+def metrics_file_for(answers_file: str, suffix: str = "") -> str:
+    return answers_file.replace(".json", f"{suffix}.prom")
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split("?")[0] != "/metrics":
+            self.send_error(404)
+            return
+        body = render().encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+def serve_metrics(port: int, host: str = "127.0.0.1") -> ThreadingHTTPServer:
+    """Serves GET /metrics from a daemon thread for as long as the process runs"""
+    server = ThreadingHTTPServer((host, port), _MetricsHandler)
+    threading.Thread(target=server.serve_forever, daemon=True, name="metrics-http").start()
+    return server
+
+# Hot-path metrics shared by every process that runs tools or LLM calls
+
+TOOL_LATENCY = Histogram("scm_tool_seconds", "Tool function latency", ("tool",))
+TOOL_CALLS = Counter("scm_tool_calls_total", "Tool calls by outcome (ok, error_result for ERROR: strings, exception)", ("tool", "outcome"))
+TOOL_INFLIGHT = Gauge("scm_tool_inflight", "Tool calls currently running", ("tool",))
+
+LLM_LATENCY = Histogram("scm_llm_seconds", "LLM call latency", ("node", "model"))
+LLM_TOKENS = Histogram("scm_llm_tokens", "Tokens per LLM call", ("node", "model", "direction"), buckets=TOKEN_BUCKETS)
+LLM_CALLS = Counter("scm_llm_calls_total", "LLM calls by outcome", ("node", "model", "outcome"))
+LLM_INFLIGHT = Gauge("scm_llm_inflight", "LLM calls currently waiting on the backend", ("model",))
+
+def instrument_tool(func):
+    """Records latency, in-flight count and outcome of a tools.py function"""
+    name = func.__name__
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        outcome = "exception"
+        with TOOL_INFLIGHT.in_flight(tool=name), TOOL_LATENCY.time(tool=name):
+            try:
+                result = func(*args, **kwargs)
+                outcome = "error_result" if isinstance(result, str) and result.startswith("ERROR:") else "ok"
+                return result
+            finally:
+                TOOL_CALLS.inc(tool=name, outcome=outcome)
+    return wrapper
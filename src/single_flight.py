@@ -0,0 +1,32 @@
+import asyncio
+
+class SingleFlight:
+    """Merges concurrent calls with the same key into one execution and fans the result out.
+
+    Nothing is cached: once the shared execution finishes the key is forgotten, so later calls run again.
+    """
+
+    def __init__(self):
+        self._inflight = {}
+        self.stats = {"calls": 0, "executions": 0, "coalesced": 0}
+
+    async def do(self, key, func):
+        """Awaits func() unless an identical call is already running, in which case waits for its result"""
+        self.stats["calls"] += 1
+        task = self._inflight.get(key)
+        if task is None:
+            self.stats["executions"] += 1
+            task = asyncio.ensure_future(func())
+            self._inflight[key] = task
+            task.add_done_callback(lambda t: self._forget(key, t))
+        else:
+            self.stats["coalesced"] += 1
+        # shield: a cancelled caller (leader or follower) must not cancel the execution the others wait on
+        return await asyncio.shield(task)
+
+    def _forget(self, key, task):
+        if self._inflight.get(key) is task: del self._inflight[key]
+        if not task.cancelled(): task.exception()  # mark retrieved when every caller was cancelled
+
+    def reset_stats(self):
+        for key in self.stats: self.stats[key] = 0
@@ -0,0 +1,103 @@
+import threading
+from collections import defaultdict
+
+class ReservationError(Exception):
+    """Reservation request that cannot be applied (unknown part, not enough stock, nothing to release)"""
+
+class StockStore:
+    """Stock reservations on top of a {part_id: on_hand} table.
+
+    Each part has its own lock, so agents working on different parts never wait on each other;
+    per_part_locks=False falls back to one global lock (the baseline in bench_contention.py).
+    """
+
+    def __init__(self, stock: dict, per_part_locks: bool = True):
+        self.stock = stock
+        self.per_part_locks = per_part_locks
+        self.reserved = defaultdict(dict)   # part_id -> {order_id: quantity}
+        self._locks = {}
+        self._locks_guard = threading.Lock()
+        self._global_lock = threading.Lock()
+
+    def _lock(self, part_id: str) -> threading.Lock:
+        if not self.per_part_locks: return self._global_lock
+        lock = self._locks.get(part_id)
+        if lock is None:
+            with self._locks_guard:
+                lock = self._locks.setdefault(part_id, threading.Lock())
+        return lock
+
+    def reset(self):
+        with self._locks_guard:
+            self.reserved.clear()
+
+    def snapshot(self) -> dict:
+        """Current reservations as {part_id: {order_id: quantity}}, parts without any left out"""
+        return {part_id: dict(orders) for part_id, orders in list(self.reserved.items()) if orders}
+
+    def load(self, reserved: dict):
+        """Replaces all reservations with a snapshot() (e.g. from another process's store)"""
+        with self._locks_guard:
+            self.reserved.clear()
+            for part_id, orders in reserved.items(): self.reserved[part_id] = dict(orders)
+
+    def available(self, part_id: str) -> int:
+        if part_id not in self.stock: raise ReservationError(f"ID not found in stock DB: {part_id}")
+        return self.stock[part_id] - sum(self.reserved[part_id].values())
+
+    # Unlocked primitives, callers hold the part's lock
+
+    def _reserve(self, part_id: str, quantity: int, order_id: str):
+        if quantity <= 0: raise ReservationError("Quantity must be positive.")
+        free = self.available(part_id)
+        if quantity > free: raise ReservationError(f"Only {free} units of {part_id} available.")
+        self.reserved[part_id][order_id] = self.reserved[part_id].get(order_id, 0) + quantity
+
+    def _release(self, part_id: str, quantity: int, order_id: str):
+        if quantity <= 0: raise ReservationError("Quantity must be positive.")
+        if part_id not in self.stock: raise ReservationError(f"ID not found in stock DB: {part_id}")
+        held = self.reserved[part_id].get(order_id, 0)
+        if quantity > held: raise ReservationError(f"Order {order_id} holds only {held} units of {part_id}.")
+        if held == quantity: del self.reserved[part_id][order_id]
+        else: self.reserved[part_id][order_id] = held - quantity
+
+    # Locked operations
+
+    def reserve(self, part_id: str, quantity: int, order_id: str) -> int:
+        """Returns the units still available afterwards"""
+        with self._lock(part_id):
+            self._reserve(part_id, quantity, order_id)
+            return self.available(part_id)
+
+    def release(self, part_id: str, quantity: int, order_id: str) -> int:
+        with self._lock(part_id):
+            self._release(part_id, quantity, order_id)
+            return self.available(part_id)
+
+    def transfer(self, part_id: str, quantity: int, from_order: str, to_order: str) -> int:
+        """Moves a reservation between orders without the units becoming available in between"""
+        with self._lock(part_id):
+            self._release(part_id, quantity, from_order)
+            self.reserved[part_id][to_order] = self.reserved[part_id].get(to_order, 0) + quantity
+            return self.available(part_id)
+
+    def commit_batch(self, operations: list):
+        """Applies [(op, part_id, quantity, order_id), ...] all-or-nothing under one lock acquisition per part.
+
+        op is "reserve" or "release". Locks are taken in sorted part order so concurrent batches can't deadlock.
+        """
+        parts = sorted({op[1] for op in operations})
+        locks = list(dict.fromkeys(self._lock(p) for p in parts))
+        for lock in locks: lock.acquire()
+        try:
+            snapshot = {p: dict(self.reserved[p]) for p in parts}
+            try:
+                for op, part_id, quantity, order_id in operations:
+                    if op == "reserve": self._reserve(part_id, quantity, order_id)
+                    elif op == "release": self._release(part_id, quantity, order_id)
+                    else: raise ReservationError(f"Unknown operation: {op}")
+            except ReservationError:
+                for p in parts: self.reserved[p] = snapshot[p]
+                raise
+        finally:
+            for lock in reversed(locks): lock.release()
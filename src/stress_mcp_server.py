@@ -0,0 +1,80 @@
+import argparse
+import asyncio
+import json
+import os
+import random
+import sys
+import time
+
+from mcp import ClientSession, StdioServerParameters
+from mcp.client.stdio import stdio_client
+
+from load_test import percentile
+from mcp_client import SERVER_SCRIPT
+
+CODE_SCRIPT = """pid = get_part_id("{name}")
+loc = get_supplier_location(pid)
+print(f"{name}: {{get_stock_level(pid)}} units, ships from {{loc}} for {{get_shipping_cost(loc)}}")"""
+
+def make_calls(count: int, rng: random.Random) -> list:
+    """Mix of lookup tools and Code Mode scripts, each with the value its result must contain"""
+    parts = [("Engine", "ID-999", "Stuttgart"), ("Tyre", "ID-100", "Munich"),
+             ("Windshield", "ID-555", "Hamburg"), ("Brake", "ID-200", "Berlin")]
+    calls = []
+    for _ in range(count):
+        name, pid, city = rng.choice(parts)
+        calls.append(rng.choice([
+            ("find_part_id", {"part_name": name}, pid),
+            ("check_stock", {"part_id": pid}, ""),
+            ("find_supplier_city", {"part_id": pid}, city),
+            ("calculate_shipping", {"city": city}, "EUR"),
+            ("execute_python_code", {"code": CODE_SCRIPT.format(name=name)}, f"{name}: "),
+        ]))
+    return calls
+
+async def run_stress(count: int, seed: int):
+    env = os.environ.copy()
+    env["PYTHONUNBUFFERED"] = "1"
+    server_params = StdioServerParameters(command=sys.executable, args=[SERVER_SCRIPT], env=env)
+    calls = make_calls(count, random.Random(seed))
+
+    async with stdio_client(server_params) as (read, write):
+        async with ClientSession(read, write) as session:
+            await session.initialize()
+
+            async def timed_call(name, arguments, expect):
+                start = time.time()
+                result = await session.call_tool(name, arguments=arguments)
+                text = "".join(getattr(c, "text", "") for c in result.content)
+                ok = not result.isError and expect in text
+                if name == "execute_python_code":
+                    # Output captured per call: exactly this script's single line, nothing from overlapping scripts
+                    ok = ok and len(text.strip().splitlines()) == 1
+                return time.time() - start, ok
+
+            print(f"Firing {count} simultaneous call_tool requests...")
+            start = time.time()
+            results = await asyncio.gather(*(timed_call(*c) for c in calls))
+            elapsed = time.time() - start
+
+            stats = await session.read_resource("stats://coalescing")
+            coalescing = json.loads(stats.contents[0].text)
+
+    latencies = [r[0] for r in results]
+    failures = len([r for r in results if not r[1]])
+
+    print("-" * 50)
+    print(f"Wall time:   {elapsed:.2f}s")
+    print(f"Throughput:  {count / elapsed:.1f} calls/s")
+    print(f"p50 latency: {percentile(latencies, 50) * 1000:.1f} ms")
+    print(f"p99 latency: {percentile(latencies, 99) * 1000:.1f} ms")
+    print(f"Failures:    {failures}/{count}")
+    print(f"Coalesced:   {coalescing['coalesced']}/{coalescing['calls']} lookups shared an in-flight execution")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Stress mcp_server.py with concurrent tool calls")
+    parser.add_argument("--count", type=int, default=500)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    asyncio.run(run_stress(args.count, args.seed))
@@ -0,0 +1,55 @@
+import asyncio
+
+from single_flight import SingleFlight
+
+def test_concurrent_calls_share_one_execution():
+    async def scenario():
+        flight = SingleFlight()
+        runs = []
+
+        async def lookup():
+            runs.append(1)
+            await asyncio.sleep(0.05)
+            return "ID-100"
+
+        results = await asyncio.gather(*[flight.do("engine", lookup) for _ in range(5)])
+        return flight, runs, results
+
+    flight, runs, results = asyncio.run(scenario())
+    assert results == ["ID-100"] * 5
+    assert len(runs) == 1
+    assert flight.stats == {"calls": 5, "executions": 1, "coalesced": 4}
+    assert not flight._inflight
+
+def test_cancelled_leader_does_not_cancel_followers():
+    async def scenario():
+        flight = SingleFlight()
+
+        async def lookup():
+            await asyncio.sleep(0.05)
+            return "ID-100"
+
+        leader = asyncio.create_task(flight.do("engine", lookup))
+        await asyncio.sleep(0)
+        follower = asyncio.create_task(flight.do("engine", lookup))
+        await asyncio.sleep(0)
+        leader.cancel()
+        return leader, await follower
+
+    leader, result = asyncio.run(scenario())
+    assert leader.cancelled()
+    assert result == "ID-100"
+
+def test_exception_reaches_every_caller():
+    async def scenario():
+        flight = SingleFlight()
+
+        async def lookup():
+            await asyncio.sleep(0.01)
+            raise KeyError("ID-999")
+
+        return flight, await asyncio.gather(*[flight.do("missing", lookup) for _ in range(3)], return_exceptions=True)
+
+    flight, results = asyncio.run(scenario())
+    assert all(isinstance(r, KeyError) for r in results)
+    assert not flight._inflight
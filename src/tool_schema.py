@@ -0,0 +1,65 @@
+import inspect
+import re
+
+from langchain_core.tools import StructuredTool
+
+# verbose: descriptions as written; compact: no args/usage/example sections; minimal: first sentence only
+SCHEMA_MODES = ["verbose", "compact", "minimal"]
+
+# Sections dropped in compact mode; anything else (e.g. the code tool's function list) is kept
+DROPPED_SECTIONS = ("Args:", "Example:", "Examples:", "USAGE:")
+
+def _first_sentence(text: str) -> str:
+    match = re.match(r"(.+?[.!?])(\s|$)", text)
+    return match.group(1) if match else text
+
+def _strip_parentheticals(text: str) -> str:
+    return re.sub(r"\s*\([^)]*\)", "", text).strip()
+
+def compact_description(description: str, mode: str = "verbose") -> str:
+    """Shortens a tool description for the given schema mode"""
+    if mode not in SCHEMA_MODES:
+        raise ValueError(f"Unknown schema mode: {mode} (expected one of {SCHEMA_MODES})")
+    description = inspect.cleandoc(description or "")
+    if mode == "verbose":
+        return description
+
+    lines = [l.strip() for l in description.splitlines() if l.strip()]
+    if mode == "minimal":
+        return _strip_parentheticals(_first_sentence(lines[0])) if lines else ""
+
+    kept = []
+    dropping = False
+    for line in lines:
+        if line.endswith(":") or line.startswith(DROPPED_SECTIONS):
+            dropping = line.startswith(DROPPED_SECTIONS)
+        if not dropping:
+            kept.append(line)
+    return "\n".join(kept)
+
+def compact_parameter(description: str, mode: str = "verbose") -> str:
+    """Terse parameter description: drop parentheticals in compact mode, drop entirely in minimal"""
+    if mode == "verbose": return description
+    if mode == "minimal": return ""
+    return _strip_parentheticals(description)
+
+def compact_input_schema(schema: dict, mode: str = "verbose") -> dict:
+    """Returns a copy of an MCP inputSchema with shortened parameter descriptions"""
+    if mode == "verbose": return schema
+    properties = {}
+    for name, detail in schema.get("properties", {}).items():
+        detail = {k: v for k, v in detail.items() if k != "title"}
+        if "description" in detail:
+            text = compact_parameter(detail["description"], mode)
+            if text: detail["description"] = text
+            else: del detail["description"]
+        properties[name] = detail
+    return {**schema, "properties": properties}
+
+def compact_tools(functions: list, mode: str = "verbose") -> list:
+    """Wraps plain tool functions (tools.py) with descriptions for the given schema mode"""
+    if mode == "verbose": return list(functions)
+    return [
+        StructuredTool.from_function(func=f, name=f.__name__, description=compact_description(f.__doc__, mode))
+        for f in functions
+    ]
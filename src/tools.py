@@ -1,7 +1,12 @@
 import difflib
+import json
 import logging
+import os
 import re
 
+from metrics import instrument_tool
+from stock_store import ReservationError, StockStore
+
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(message)s')
 logger = logging.getLogger("SCM_Tools")
 
@@ -10,8 +15,29 @@ DB_STOCK = {"ID-999": 4, "ID-100": 200, "ID-555": 15, "ID-200": 50}
 DB_SUPPLIERS = {"ID-999": "Stuttgart", "ID-100": "Munich", "ID-555": "Hamburg", "ID-200": "Berlin"}
 DB_SHIPPING = {"Stuttgart": 150, "Munich": 50, "Hamburg": 80, "Berlin": 60}
 
+# Reservations against DB_STOCK, safe for concurrent agents (one lock per part)
+STOCK_STORE = StockStore(DB_STOCK)
+
+def load_catalog(path: str):
+    """Replaces the DB_* tables in place with a catalog file written by workload.py"""
+    with open(path, 'r') as f: catalog = json.load(f)
+    for table, key in [(DB_PARTS, "parts"), (DB_STOCK, "stock"), (DB_SUPPLIERS, "suppliers"), (DB_SHIPPING, "shipping")]:
+        table.clear()
+        table.update(catalog[key])
+    STOCK_STORE.reset()
+    logger.info(f"Loaded catalog from {path} ({len(DB_PARTS)} parts)")
+
+if os.environ.get("SCM_CATALOG"):
+    load_catalog(os.environ["SCM_CATALOG"])
+
+def normalize_part_id(part_id) -> str:
+    clean_id = str(part_id).strip()
+    if not clean_id.startswith("ID-"): clean_id = f"ID-{clean_id}"
+    return clean_id
+
 #  INVENTORY TOOLS 
 
+@instrument_tool
 def get_part_id(part_name: str) -> str:
     """
     Retrieves the technical Part ID for a given English part name (e.g., "ID-999" or an error message).
@@ -29,21 +55,26 @@ def get_part_id(part_name: str) -> str:
     matches = difflib.get_close_matches(part_name, valid_parts, n=1, cutoff=0.5)
     return DB_PARTS[matches[0]] if matches else "ERROR: Part not found."
 
+@instrument_tool
 def get_stock_level(part_id: str) -> str:
     """
     Checks the current inventory quantity for a specific Part ID.
+    If units are reserved for orders, also reports how many are still available.
     
     Args:
         part_id: The technical ID (must start with "ID-", e.g., "ID-100").
     """
     logger.info(f"get_stock_level called with: {part_id}")
-    clean_id = str(part_id).strip()
-    if not clean_id.startswith("ID-"): clean_id = f"ID-{clean_id}"
+    clean_id = normalize_part_id(part_id)
     val = DB_STOCK.get(clean_id)
-    return str(val) if val is not None else "ERROR: ID not found in stock DB."
+    if val is None: return "ERROR: ID not found in stock DB."
+    available = STOCK_STORE.available(clean_id)
+    if available == val: return str(val)
+    return f"{val} on hand, {available} available ({val - available} reserved for orders)"
 
 #  LOGISTICS TOOLS 
 
+@instrument_tool
 def get_supplier_location(part_id: str) -> str:
     """
     Finds the city where the supplier for a specific Part ID is located.
@@ -52,10 +83,10 @@ def get_supplier_location(part_id: str) -> str:
         part_id: The technical ID (must start with "ID-", e.g., "ID-100").
     """
     logger.info(f"get_supplier_location called with: {part_id}")
-    clean_id = str(part_id).strip()
-    if not clean_id.startswith("ID-"): clean_id = f"ID-{clean_id}"
+    clean_id = normalize_part_id(part_id)
     return DB_SUPPLIERS.get(clean_id, "ERROR: ID not found in supplier DB.")
 
+@instrument_tool
 def get_shipping_cost(city: str) -> str:
     """
     Calculates the shipping cost to transport items from a specific Supplier City.
@@ -68,4 +99,89 @@ def get_shipping_cost(city: str) -> str:
     for valid_city in DB_SHIPPING.keys():
         if valid_city.lower() in city_str.lower():
             return f"{DB_SHIPPING[valid_city]} EUR"
-    return "ERROR: City not found in logistics DB (Must be Stuttgart, Munich, Hamburg, or Berlin)."
\ No newline at end of file
+    return "ERROR: City not found in logistics DB (Must be Stuttgart, Munich, Hamburg, or Berlin)."
+
+#  RESERVATION TOOLS 
+
+def _reservation_args(part_id, quantity):
+    clean_id = normalize_part_id(part_id)
+    try:
+        return clean_id, int(str(quantity).strip())
+    except ValueError:
+        raise ReservationError(f"Quantity must be a whole number, got '{quantity}'.")
+
+@instrument_tool
+def reserve_stock(part_id: str, quantity: int, order_id: str) -> str:
+    """
+    Reserves units of a Part ID for an order so other orders cannot take them.
+    
+    Args:
+        part_id: The technical ID (must start with "ID-", e.g., "ID-100").
+        quantity: Number of units to reserve.
+        order_id: The order the units are reserved for.
+    """
+    logger.info(f"reserve_stock called with: {part_id}, {quantity}, {order_id}")
+    try:
+        clean_id, qty = _reservation_args(part_id, quantity)
+        left = STOCK_STORE.reserve(clean_id, qty, str(order_id))
+        return f"Reserved {qty} units of {clean_id} for order {order_id}. {left} units still available."
+    except ReservationError as e:
+        return f"ERROR: {e}"
+
+@instrument_tool
+def release_stock(part_id: str, quantity: int, order_id: str) -> str:
+    """
+    Releases units previously reserved for an order back into available stock.
+    
+    Args:
+        part_id: The technical ID (must start with "ID-", e.g., "ID-100").
+        quantity: Number of units to release.
+        order_id: The order that holds the reservation.
+    """
+    logger.info(f"release_stock called with: {part_id}, {quantity}, {order_id}")
+    try:
+        clean_id, qty = _reservation_args(part_id, quantity)
+        left = STOCK_STORE.release(clean_id, qty, str(order_id))
+        return f"Released {qty} units of {clean_id} from order {order_id}. {left} units now available."
+    except ReservationError as e:
+        return f"ERROR: {e}"
+
+@instrument_tool
+def transfer_reservation(part_id: str, quantity: int, from_order_id: str, to_order_id: str) -> str:
+    """
+    Moves reserved units of a Part ID from one order to another.
+    
+    Args:
+        part_id: The technical ID (must start with "ID-", e.g., "ID-100").
+        quantity: Number of reserved units to move.
+        from_order_id: The order currently holding the reservation.
+        to_order_id: The order receiving the reservation.
+    """
+    logger.info(f"transfer_reservation called with: {part_id}, {quantity}, {from_order_id} -> {to_order_id}")
+    try:
+        clean_id, qty = _reservation_args(part_id, quantity)
+        STOCK_STORE.transfer(clean_id, qty, str(from_order_id), str(to_order_id))
+        return f"Moved {qty} reserved units of {clean_id} from order {from_order_id} to order {to_order_id}."
+    except ReservationError as e:
+        return f"ERROR: {e}"
+
+#  CALL COALESCING 
+
+def _part_name_key(part_name) -> str:
+    # Exact matches are case-insensitive; the fuzzy fallback is not, so only those names are folded
+    name = str(part_name)
+    return name.lower() if any(k.lower() == name.lower() for k in DB_PARTS) else name
+
+# Read-only tools: function name -> (MCP server alias, normalized argument key)
+READ_ONLY_TOOLS = {
+    "get_part_id": ("find_part_id", lambda a: _part_name_key(a.get("part_name", ""))),
+    "get_stock_level": ("check_stock", lambda a: normalize_part_id(a.get("part_id", ""))),
+    "get_supplier_location": ("find_supplier_city", lambda a: normalize_part_id(a.get("part_id", ""))),
+    "get_shipping_cost": ("calculate_shipping", lambda a: str(a.get("city", "")).lower()),
+}
+
+def lookup_key(tool_name: str, arguments: dict):
+    """Identity of a read-only call after argument normalization; None for tools with side effects"""
+    for name, (alias, key) in READ_ONLY_TOOLS.items():
+        if tool_name in (name, alias): return (name, key(arguments))
+    return None
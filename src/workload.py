@@ -0,0 +1,177 @@
+import argparse
+import json
+import os
+import random
+
+from tools import DB_PARTS, DB_SHIPPING, DB_STOCK, DB_SUPPLIERS
+
+DEFAULT_TEST_SET = "../test/test_set.json"
+OUTPUT_FILE = "../test/test_set_synthetic.json"
+CATALOG_FILE = "../test/catalog_synthetic.json"
+
+PART_NOUNS = ["Alternator", "Radiator", "Gearbox", "Clutch", "Axle", "Bumper", "Headlight", "Mirror", "Piston",
+              "Crankshaft", "Camshaft", "Turbocharger", "Spark Plug", "Fuel Pump", "Oil Filter", "Air Filter",
+              "Battery", "Starter Motor", "Exhaust", "Muffler", "Suspension Spring", "Shock Absorber", "Steering Rack",
+              "Wheel Hub", "Brake Disc", "Brake Pad", "Timing Belt", "Water Pump", "Thermostat", "Injector"]
+CITIES = ["Stuttgart", "Munich", "Hamburg", "Berlin", "Cologne", "Frankfurt", "Dresden", "Leipzig", "Bremen",
+          "Hanover", "Nuremberg", "Dortmund", "Duisburg", "Bochum", "Wuppertal", "Bielefeld", "Bonn", "Mannheim",
+          "Karlsruhe", "Augsburg", "Wiesbaden", "Kiel", "Rostock", "Potsdam", "Regensburg", "Ulm", "Freiburg"]
+
+# (template, chain for one part); {name} is filled with a part name
+SINGLE_TEMPLATES = {
+    1: [("What is the ID for the {name}?", ["get_part_id"])],
+    2: [("How many units of {name} are in stock?", ["get_part_id", "get_stock_level"]),
+        ("Where is the {name} supplier located?", ["get_part_id", "get_supplier_location"])],
+    3: [("What is the shipping cost to get one {name}?", ["get_part_id", "get_supplier_location", "get_shipping_cost"])],
+}
+
+def current_catalog() -> dict:
+    """The catalog backing tools.py"""
+    return {"parts": dict(DB_PARTS), "stock": dict(DB_STOCK), "suppliers": dict(DB_SUPPLIERS), "shipping": dict(DB_SHIPPING)}
+
+def synthetic_catalog(n_parts: int, rng: random.Random) -> dict:
+    """Large catalog in the tools.py layout; part names are unique, cities never contain each other"""
+    cities = [c for c in CITIES if not any(o != c and o.lower() in c.lower() for o in CITIES)]
+    names = []
+    for i in range(n_parts):
+        noun = PART_NOUNS[i % len(PART_NOUNS)]
+        variant = i // len(PART_NOUNS)
+        names.append(noun if variant == 0 else f"{noun} Mk{variant + 1}")
+
+    parts = {name: f"ID-{1000 + i}" for i, name in enumerate(names)}
+    return {
+        "parts": parts,
+        "stock": {pid: rng.randint(0, 500) for pid in parts.values()},
+        "suppliers": {pid: rng.choice(cities) for pid in parts.values()},
+        "shipping": {city: rng.randrange(20, 300, 5) for city in cities}
+    }
+
+def _join(names: list) -> str:
+    return names[0] if len(names) == 1 else ", ".join(names[:-1]) + " and " + names[-1]
+
+def make_question(catalog: dict, hops: int, rng: random.Random) -> dict:
+    """One question with ground truth; hops > 3 become aggregations over several parts.
+
+    Even hops sum stock (2 per part), multiples of 3 sum shipping (3 per part), other odd hops sum shipping
+    for parts sharing one supplier city (2 per part + 1 cost lookup). If no city has enough parts for that,
+    the question falls back to a stock sum of hops - 1.
+    """
+    names = list(catalog["parts"].keys())
+    pid = lambda n: catalog["parts"][n]
+    city = lambda n: catalog["suppliers"][pid(n)]
+
+    if hops in SINGLE_TEMPLATES:
+        template, chain = rng.choice(SINGLE_TEMPLATES[hops])
+        name = rng.choice(names)
+        answer = {
+            "get_part_id": pid(name),
+            "get_stock_level": str(catalog["stock"][pid(name)]),
+            "get_supplier_location": city(name),
+            "get_shipping_cost": f"{catalog['shipping'][city(name)]} EUR"
+        }[chain[-1]]
+        return {"q": template.format(name=name), "hops": hops, "chain": chain, "expected": answer}
+
+    # Aggregations: 2 hops per part for stock sums, 3 per part for shipping sums
+    if hops % 3 == 0 and (hops % 2 != 0 or rng.random() < 0.5):
+        picked = rng.sample(names, min(hops // 3, len(names)))
+        total = sum(catalog["shipping"][city(n)] for n in picked)
+        return {
+            "q": f"What is the combined shipping cost to get one each of {_join(picked)}?",
+            "hops": 3 * len(picked),
+            "chain": ["get_part_id", "get_supplier_location", "get_shipping_cost"] * len(picked),
+            "expected": f"{total} EUR"
+        }
+
+    if hops % 2 == 1:
+        k = (hops - 1) // 2
+        by_city = {}
+        for n in names: by_city.setdefault(city(n), []).append(n)
+        shared = sorted(c for c, members in by_city.items() if len(members) >= k)
+        if shared:
+            supplier = rng.choice(shared)
+            picked = rng.sample(by_city[supplier], k)
+            return {
+                "q": f"What is the combined shipping cost to get one each of {_join(picked)}?",
+                "hops": 2 * k + 1,
+                "chain": ["get_part_id", "get_supplier_location"] * k + ["get_shipping_cost"],
+                "expected": f"{k * catalog['shipping'][supplier]} EUR"
+            }
+
+    picked = rng.sample(names, min(max(2, hops // 2), len(names)))
+    total = sum(catalog["stock"][pid(n)] for n in picked)
+    return {
+        "q": f"What is the total inventory count for {_join(picked)}?",
+        "hops": 2 * len(picked),
+        "chain": ["get_part_id", "get_stock_level"] * len(picked),
+        "expected": str(total)
+    }
+
+def generate(catalog: dict, count: int, max_hops: int, path: str, seed: int = 0):
+    """Streams `count` questions to a JSON array file without keeping them in memory"""
+    rng = random.Random(seed)
+    with open(path, 'w') as f:
+        f.write("[\n")
+        for i in range(count):
+            case = {"id": i + 1, **make_question(catalog, rng.randint(1, max_hops), rng)}
+            f.write(("" if i == 0 else ",\n") + "    " + json.dumps(case))
+        f.write("\n]\n")
+
+def test_set_suffix(path: str) -> str:
+    """"" for the committed test set, "_<name>" for any other, so its answers don't overwrite the baselines"""
+    if os.path.abspath(path) == os.path.abspath(DEFAULT_TEST_SET): return ""
+    name = os.path.splitext(os.path.basename(path))[0]
+    return "_" + (name[len("test_set_"):] if name.startswith("test_set_") else name)
+
+def iter_test_cases(path: str, chunk_size: int = 65536):
+    """Yields cases from a JSON array file one at a time instead of json.load-ing the whole list"""
+    decoder = json.JSONDecoder()
+    buffer = ""
+    started = False
+
+    with open(path, 'r') as f:
+        while True:
+            chunk = f.read(chunk_size)
+            buffer += chunk
+            pos = 0
+            while True:
+                while pos < len(buffer) and buffer[pos] in " \t\r\n,":
+                    pos += 1
+                if not started:
+                    if pos >= len(buffer): break
+                    if buffer[pos] != "[": raise ValueError(f"Expected a JSON array in {path}")
+                    started = True
+                    pos += 1
+                    continue
+                if pos < len(buffer) and buffer[pos] == "]":
+                    return
+                try:
+                    case, end = decoder.raw_decode(buffer, pos)
+                except json.JSONDecodeError:
+                    break  # incomplete object, read more
+                yield case
+                pos = end
+            buffer = buffer[pos:]
+            if not chunk:
+                if buffer.strip(): raise ValueError(f"Truncated JSON array in {path}")
+                return
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Generate a synthetic SCM test set with ground truth")
+    parser.add_argument("--count", type=int, default=1000)
+    parser.add_argument("--max-hops", type=int, default=6)
+    parser.add_argument("--parts", type=int, default=0, help="synthetic catalog size (0 = current tools.py catalog)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", default=OUTPUT_FILE)
+    parser.add_argument("--catalog-output", default=CATALOG_FILE)
+    args = parser.parse_args()
+
+    if args.parts > 0:
+        catalog = synthetic_catalog(args.parts, random.Random(args.seed))
+        with open(args.catalog_output, 'w') as f: json.dump(catalog, f, indent=2)
+        print(f"Synthetic catalog with {args.parts} parts saved to {args.catalog_output}")
+        print(f"Run the agents with SCM_CATALOG={args.catalog_output} so tools.py serves it.")
+    else:
+        catalog = current_catalog()
+
+    generate(catalog, args.count, args.max_hops, args.output, args.seed)
+    print(f"Generated {args.count} questions (1-{args.max_hops} hops) in {args.output}")